@@ -0,0 +1,80 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""compares creating parts one by one, the way the Create commands do,
+with buildBatch. Run headless with
+
+    FreeCADCmd benchmarks/batch.py
+
+the part counts can be set with CONSTRUCTIONTOY_BENCH_PARTS=10,100,1000
+"""
+
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import FreeCAD as App
+
+from freecad.constructiontoy import shapecache
+from freecad.constructiontoy.batch import PartSpec, makeFeature, buildBatch
+
+
+def specs(count):
+    # a mix of the four part types on a line, so that placements differ
+    kinds = ["plate", "separator", "washer", "screw"]
+    return [PartSpec(kinds[i % 4], placement=(40.0 * i, 0, 0)) for i in range(count)]
+
+
+def perPart(doc, specs):
+    for spec in specs:
+        makeFeature(doc, spec.kind, spec.parameters, spec.placement)
+        doc.recompute()
+
+
+def batched(doc, specs):
+    buildBatch(specs, doc, progress=lambda done, total: None, fit=False)
+
+
+def timeit(build, count):
+    shapecache.clear()
+    doc = App.newDocument("ConstructionToyBenchmark")
+    try:
+        start = time.time()
+        build(doc, specs(count))
+        return time.time() - start
+    finally:
+        App.closeDocument(doc.Name)
+
+
+def run(counts):
+    results = []
+    for count in counts:
+        serial = timeit(perPart, count)
+        batch = timeit(batched, count)
+        results.append((count, serial, batch))
+        App.Console.PrintMessage("{0:6d} parts: per part {1:8.3f} s, batch {2:8.3f} s, speedup {3:6.1f}x\n"
+                                 .format(count, serial, batch, serial / max(batch, 1e-9)))
+    return results
+
+
+if __name__ == "__main__":
+    counts = os.environ.get("CONSTRUCTIONTOY_BENCH_PARTS", "10,100,1000")
+    run([int(c) for c in counts.split(",")])
@@ -0,0 +1,232 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""benchmark harness of the construction toy features. Run headless with
+
+    FreeCADCmd benchmarks/run.py
+
+It times execute() of every feature class over parameter sweeps and the
+recompute of generated assemblies, records the peak resident memory of
+each case in a forked child, writes the results as JSON and compares them
+with a stored baseline. Settings are read from the environment:
+
+    CONSTRUCTIONTOY_BENCH_OUTPUT      results file (benchmarks/results.json)
+    CONSTRUCTIONTOY_BENCH_BASELINE    baseline file (benchmarks/baseline.json)
+    CONSTRUCTIONTOY_BENCH_THRESHOLD   allowed slowdown factor (1.25)
+    CONSTRUCTIONTOY_BENCH_SAVE        1 to store the results as new baseline
+    CONSTRUCTIONTOY_BENCH_QUICK       1 for a reduced sweep
+"""
+
+import os, sys, json, time, platform, tempfile, traceback
+from contextlib import contextmanager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import FreeCAD as App
+
+from freecad.constructiontoy import shapecache, brepcache
+from freecad.constructiontoy.batch import PartSpec, makeFeature, buildBatch
+from freecad.constructiontoy.features import COSMETIC, REAL_THREAD
+
+QUICK = os.environ.get("CONSTRUCTIONTOY_BENCH_QUICK") == "1"
+
+
+@contextmanager
+def coldCaches():
+    """empty shape caches and a scratch brep cache removed afterwards"""
+    shapecache.clear()
+    with tempfile.TemporaryDirectory(prefix="ctbench") as directory:
+        previous = brepcache.setBrepCache(brepcache.BrepCache(directory, 1 << 30))
+        try:
+            yield
+        finally:
+            brepcache.setBrepCache(previous)
+
+
+def memoryStatus(field):
+    """a field of /proc/self/status in kB"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def peakMemory(run):
+    """growth of the peak resident memory while run() executes with cold
+    caches, in kB, or None where it cannot be measured. run() executes in
+    a forked child, so the OCC allocations are counted as well and every
+    case starts from the same parent"""
+    if not hasattr(os, "fork") or not os.path.exists("/proc/self/status"):
+        return None
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read)
+            try:
+                # resets VmHWM to the current resident size
+                with open("/proc/self/clear_refs", "w") as f:
+                    f.write("5")
+                before = memoryStatus("VmRSS")
+            except OSError:
+                before = memoryStatus("VmHWM")
+            with coldCaches():
+                run()
+            os.write(write, str(max(memoryStatus("VmHWM") - before, 0)).encode())
+            status = 0
+        except Exception:
+            traceback.print_exc()
+        finally:
+            os._exit(status)
+    os.close(write)
+    with os.fdopen(read) as f:
+        peak = f.read()
+    os.waitpid(pid, 0)
+    return int(peak) if peak else None
+
+
+def measure(name, run, repeat=1):
+    """runs run() with cold caches and returns its best time and its peak
+    memory. The memory is taken in a pass of its own"""
+    best = None
+    for i in range(repeat):
+        with coldCaches():
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    result = {"seconds": best, "peak_rss_kb": peakMemory(run)}
+    App.Console.PrintMessage("{0:50s} {1:9.4f} s\n".format(name, best))
+    return name, result
+
+
+def executeOnce(kind, parameters):
+    """creates one feature in a scratch document and times its execute()"""
+    doc = App.newDocument("ConstructionToyBench")
+    try:
+        obj = makeFeature(doc, kind, parameters)
+        return lambda: obj.Proxy.execute(obj), doc
+    except Exception:
+        App.closeDocument(doc.Name)
+        raise
+
+
+def featureCases():
+    plates = [1, 5, 10] if QUICK else [1, 5, 10, 25, 50]
+    for n in plates:
+        for fillet in ("0 mm", "1 mm"):
+            yield ("plate {0}x{0} fillet {1}".format(n, fillet),
+                   "plate", {"xoccurrences": n, "yoccurrences": n, "fillet": fillet})
+    for height in ("5 mm", "32 mm"):
+        for fillet in ("0 mm", "1 mm"):
+            yield ("separator height {0} fillet {1}".format(height, fillet),
+                   "separator", {"height": height, "fillet": fillet})
+    yield ("washer", "washer", {})
+    lengths = [30] if QUICK else [10, 20, 30, 60]
+    pitches = [2] if QUICK else [1.5, 2, 3]
+    for length in lengths:
+        for pitch in pitches:
+            for lod in (COSMETIC, REAL_THREAD):
+                yield ("screw {0} mm pitch {1} {2}".format(length, pitch, lod.lower()),
+                       "screw", {"height": "{0} mm".format(length),
+                                 "screwpitch": "{0} mm".format(pitch),
+                                 "LevelOfDetail": lod})
+
+
+def assembly(count):
+    kinds = ["plate", "separator", "washer", "screw"]
+    return [PartSpec(kinds[i % 4], placement=(40.0 * (i % 100), 40.0 * (i // 100), 0))
+            for i in range(count)]
+
+
+def recomputeCase(count):
+    def run():
+        doc = App.newDocument("ConstructionToyBench")
+        try:
+            buildBatch(assembly(count), doc, progress=lambda done, total: None, fit=False)
+        finally:
+            App.closeDocument(doc.Name)
+    return run
+
+
+def runAll():
+    results = {}
+    for name, kind, parameters in featureCases():
+        run, doc = executeOnce(kind, parameters)
+        try:
+            key, result = measure("execute " + name, run, repeat=3)
+        finally:
+            App.closeDocument(doc.Name)
+        results[key] = result
+    counts = [10, 100] if QUICK else [10, 100, 1000, 10000]
+    for count in counts:
+        key, result = measure("recompute {0} parts".format(count), recomputeCase(count))
+        results[key] = result
+    return results
+
+
+def compare(results, baseline, threshold):
+    """returns the names of the cases that got slower than threshold times
+    their baseline"""
+    regressions = []
+    for name, result in sorted(results.items()):
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        ratio = result["seconds"] / max(reference["seconds"], 1e-6)
+        if ratio > threshold:
+            regressions.append(name)
+            App.Console.PrintWarning("regression {0}: {1:.4f} s, baseline {2:.4f} s ({3:.2f}x)\n"
+                                     .format(name, result["seconds"], reference["seconds"], ratio))
+    return regressions
+
+
+def main():
+    output = os.environ.get("CONSTRUCTIONTOY_BENCH_OUTPUT", os.path.join(HERE, "results.json"))
+    baselineFile = os.environ.get("CONSTRUCTIONTOY_BENCH_BASELINE", os.path.join(HERE, "baseline.json"))
+    threshold = float(os.environ.get("CONSTRUCTIONTOY_BENCH_THRESHOLD", "1.25"))
+
+    report = {"meta": {"freecad": ".".join(App.Version()[:3]),
+                       "python": platform.python_version(),
+                       "machine": platform.machine(),
+                       "quick": QUICK,
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "results": runAll()}
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+
+    if os.environ.get("CONSTRUCTIONTOY_BENCH_SAVE") == "1":
+        with open(baselineFile, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        return 0
+    if not os.path.exists(baselineFile):
+        App.Console.PrintMessage("no baseline at " + baselineFile + ", comparison skipped\n")
+        return 0
+    with open(baselineFile) as f:
+        baseline = json.load(f)
+    return 1 if compare(report["results"], baseline, threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""measures what loading the workbench costs at startup and what is
+deferred to the first use of a command. Run it in a fresh interpreter:
+
+    FreeCADCmd benchmarks/startup.py
+
+Before the lazy imports the startup cost was the sum of both numbers.
+"""
+
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import FreeCAD as App
+
+
+def timedImport(statement):
+    """executes an import statement, returns its time and the number of
+    modules it loaded"""
+    before = set(sys.modules)
+    start = time.time()
+    exec(statement, {})
+    return time.time() - start, len(set(sys.modules) - before)
+
+
+def main():
+    startup = timedImport("import freecad.constructiontoy.commands")
+    deferred = timedImport("import freecad.constructiontoy.features\n"
+                           "import freecad.constructiontoy.screwgeometry\n"
+                           "import freecad.constructiontoy.thread\n"
+                           "try:\n"
+                           "    import screw_maker2_2\n"
+                           "except ImportError:\n"
+                           "    pass\n")
+    App.Console.PrintMessage("workbench startup:      {0:8.4f} s, {1:4d} modules\n".format(*startup))
+    App.Console.PrintMessage("deferred to first use:  {0:8.4f} s, {1:4d} modules\n".format(*deferred))
+    App.Console.PrintMessage("eager import (before):  {0:8.4f} s, {1:4d} modules\n".format(
+        startup[0] + deferred[0], startup[1] + deferred[1]))
+
+
+if __name__ == "__main__":
+    main()
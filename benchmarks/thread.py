@@ -0,0 +1,104 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""compares the built-in thread generator with screw_maker2_2, which
+real-thread screws are made with by default, in build time, volume and
+face count. Run headless with
+
+    FreeCADCmd benchmarks/thread.py
+
+screw_maker2_2 has to be on the Python path for the comparison, without
+it only the built-in generator is timed. The screw lengths can be set with
+CONSTRUCTIONTOY_BENCH_LENGTHS=10,20,40
+
+The ThreadGenerator preference should only default to "builtin" once
+these numbers show it faster at a matching volume.
+"""
+
+import os, sys, time, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import FreeCAD as App
+
+from freecad.constructiontoy import core, brepcache, shapecache
+from freecad.constructiontoy.features import (makeScrew, screwMaker, REAL_THREAD,
+                                              SCREW_MAKER, BUILTIN_THREAD)
+
+
+def timed(build):
+    start = time.perf_counter()
+    shape = build()
+    return time.perf_counter() - start, shape
+
+
+def coldScrew(generator, l, P, dia, e, k):
+    # cold caches, so that every run builds the whole screw, the brep cache
+    # is the scratch one installed by main
+    shapecache.clear()
+    brepcache.clear()
+    return makeScrew(l, P, dia, e, k, lod=REAL_THREAD, generator=generator)
+
+
+def report(name, seconds, shape):
+    App.Console.PrintMessage("  {0:12s} {1:8.3f} s, volume {2:10.2f} mm3, {3:5d} faces, valid {4}\n"
+                             .format(name, seconds, shape.Volume, len(shape.Faces), shape.isValid()))
+
+
+def run(lengths):
+    try:
+        screwMaker()
+        legacy = True
+    except ImportError:
+        legacy = False
+        App.Console.PrintMessage("screw_maker2_2 not found, timing the built-in generator only\n")
+    defaults = core.DEFAULTS["screw"]
+    results = []
+    for length in lengths:
+        args = (length, defaults["screwpitch"], defaults["screwdiameter"],
+                defaults["outerdiameter"], defaults["headheight"])
+        App.Console.PrintMessage("screw length {0:g} mm\n".format(length))
+        new = timed(lambda: coldScrew(BUILTIN_THREAD, *args))
+        report("built-in", *new)
+        old = None
+        if legacy:
+            old = timed(lambda: coldScrew(SCREW_MAKER, *args))
+            report("screw_maker", *old)
+            App.Console.PrintMessage("  speedup {0:6.1f}x, volume difference {1:6.2f} %, "
+                                     "faces {2:+d}\n".format(
+                old[0] / max(new[0], 1e-9), 100.0 * (new[1].Volume - old[1].Volume) / old[1].Volume,
+                len(new[1].Faces) - len(old[1].Faces)))
+        results.append((length, new, old))
+    return results
+
+
+def main():
+    lengths = os.environ.get("CONSTRUCTIONTOY_BENCH_LENGTHS", "10,20,40")
+    with tempfile.TemporaryDirectory(prefix="ctbench") as directory:
+        previous = brepcache.setBrepCache(brepcache.BrepCache(directory, 1 << 30))
+        try:
+            return run([float(l) for l in lengths.split(",")])
+        finally:
+            brepcache.setBrepCache(previous)
+
+
+if __name__ == "__main__":
+    main()
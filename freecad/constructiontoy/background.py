@@ -0,0 +1,196 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""background regeneration of expensive shapes
+
+While a shape is built in a worker process the feature shows a cheap
+placeholder. There is one build per shape key, however many objects wait
+for it; an edit moves its object to the build of the new key, and builds
+nobody waits for any more are cancelled if they did not start yet. A
+finished build is put into the shape cache and every waiting object is
+recomputed, which swaps the shape in with a single assignment. A failed
+build is logged and done again in the GUI process.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import FreeCAD as App
+
+from . import shapecache
+from .parallel import buildBrep, workerCount, shapeFromBrep, poolContext
+from .preferences import getParameters
+
+__all__ = ["isEnabled", "enable", "submit", "withdraw", "pending", "cancelAll"]
+
+POLL_INTERVAL = 100  # ms
+
+_enabled = None
+
+
+def isEnabled():
+    """background builds need the GUI event loop and the BackgroundBuild
+    preference, or enable()"""
+    global _enabled
+    if _enabled is None:
+        _enabled = getParameters().GetBool("BackgroundBuild", False)
+    return _enabled and App.GuiUp
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+
+
+class BackgroundBuilder(object):
+
+    """ runs shape builds in a process pool and swaps in their results"""
+
+    def __init__(self):
+        self.executor = None
+        self.timer = None
+        # shape key -> future of its build
+        self.builds = {}
+        # (document name, object name) -> shape key the object waits for
+        self.waiting = {}
+
+    def submit(self, fp, key):
+        """returns False if there is no usable worker pool"""
+        if self.executor is None:
+            context = poolContext()
+            if context is None:
+                return False
+            self.executor = ProcessPoolExecutor(max_workers=workerCount(), mp_context=context)
+        job = (fp.Document.Name, fp.Name)
+        previous = self.waiting.get(job)
+        if previous == key:
+            return True
+        self.waiting[job] = key
+        if previous is not None:
+            self.release(previous)
+        if key not in self.builds:
+            try:
+                self.builds[key] = self.executor.submit(buildBrep, key)
+            except Exception as e:
+                # a broken pool is replaced on the next submit
+                App.Console.PrintWarning("construction toy: background pool failed: " + str(e) + "\n")
+                self.executor = None
+                del self.waiting[job]
+                return False
+        self.startTimer()
+        return True
+
+    def withdraw(self, fp):
+        """stops fp from waiting for its build, cancelling the build if
+        nobody else waits for it"""
+        key = self.waiting.pop((fp.Document.Name, fp.Name), None)
+        if key is not None:
+            self.release(key)
+
+    def release(self, key):
+        """cancels the build of key if no object waits for it any more"""
+        if key not in self.waiting.values():
+            future = self.builds.get(key)
+            if future is not None and future.cancel():
+                del self.builds[key]
+
+    def startTimer(self):
+        if self.timer is None:
+            from PySide import QtCore
+            self.timer = QtCore.QTimer()
+            self.timer.timeout.connect(self.poll)
+        if not self.timer.isActive():
+            self.timer.start(POLL_INTERVAL)
+
+    def poll(self):
+        for key, future in list(self.builds.items()):
+            if not future.done():
+                continue
+            del self.builds[key]
+            if future.cancelled():
+                continue
+            try:
+                brep = future.result()
+            except Exception as e:
+                App.Console.PrintWarning("construction toy: background build of " + str(key) +
+                                         " failed, building it here: " + str(e) + "\n")
+                try:
+                    brep = buildBrep(key)
+                except Exception as e:
+                    App.Console.PrintError("construction toy: build of " + str(key) +
+                                           " failed: " + str(e) + "\n")
+                    self.forget(key)
+                    continue
+            shapecache.shapeCache.put(key, shapeFromBrep(brep), copy=False)
+            # objects edited meanwhile wait for another key and are left alone
+            for job in self.forget(key):
+                self.swap(job)
+        if not self.builds and self.timer is not None:
+            self.timer.stop()
+
+    def forget(self, key):
+        """stops the objects waiting for key from waiting, returns them"""
+        jobs = [job for job, wanted in self.waiting.items() if wanted == key]
+        for job in jobs:
+            del self.waiting[job]
+        return jobs
+
+    def swap(self, job):
+        docname, objname = job
+        try:
+            doc = App.getDocument(docname)
+        except NameError:
+            return
+        obj = doc.getObject(objname)
+        if obj is None:
+            return
+        # execute finds the finished shape in the cache and assigns it
+        obj.touch()
+        obj.recompute()
+
+    def cancelAll(self):
+        for future in self.builds.values():
+            future.cancel()
+        self.builds.clear()
+        self.waiting.clear()
+
+
+_builder = BackgroundBuilder()
+
+
+def submit(fp, key):
+    """builds the shape of key in the background and recomputes fp when it
+    is ready, replacing any build fp still waits for. Returns False if no
+    worker pool can be started, fp has to be built in place then"""
+    return _builder.submit(fp, key)
+
+
+def withdraw(fp):
+    """forgets the build fp waits for, as its shape was assigned otherwise"""
+    _builder.withdraw(fp)
+
+
+def pending():
+    """number of objects waiting for a background build"""
+    return len(_builder.waiting)
+
+
+def cancelAll():
+    _builder.cancelAll()
@@ -0,0 +1,107 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+import json
+
+import FreeCAD as App
+
+from .features import ViewProviderConstructionToy, plate, separator, washer, screw
+from .instances import toPlacement
+
+__all__ = ["PartSpec", "makeFeature", "buildBatch", "specsFromJson"]
+
+# part type -> (object name, feature proxy)
+FEATURES = {"plate": ("Plate", plate),
+            "separator": ("Separator", separator),
+            "washer": ("Washer", washer),
+            "screw": ("Screw", screw)}
+
+
+class PartSpec(object):
+
+    """ description of one part of a batch"""
+
+    def __init__(self, kind, parameters=None, placement=None, name=None):
+        if kind not in FEATURES:
+            raise ValueError("unknown construction toy part type: " + str(kind))
+        self.kind = kind
+        self.parameters = parameters or {}
+        self.placement = placement
+        self.name = name
+
+    def __repr__(self):
+        return "PartSpec({0!r}, {1!r}, {2!r})".format(self.kind, self.parameters, self.placement)
+
+
+def makeFeature(doc, kind, parameters=None, placement=None, name=None):
+    """adds a construction toy feature of the given type to doc without
+    recomputing it"""
+    objname, proxy = FEATURES[kind]
+    obj = doc.addObject("Part::FeaturePython", name or objname)
+    proxy(obj)
+    if obj.ViewObject is not None:
+        ViewProviderConstructionToy(obj.ViewObject)
+    for prop, value in (parameters or {}).items():
+        setattr(obj, prop, value)
+    if placement is not None:
+        obj.Placement = toPlacement(placement)
+    return obj
+
+
+def buildBatch(specs, doc=None, progress=None, fit=True):
+    """creates all parts of specs in one transaction, then recomputes the
+    document and fits the view once.
+
+    specs is a list of PartSpec objects. progress, if given, is called as
+    progress(done, total) after every created part; otherwise the FreeCAD
+    progress bar is used.
+    """
+    doc = doc or App.ActiveDocument
+    specs = list(specs)
+    indicator = None
+    if progress is None:
+        indicator = App.Base.ProgressIndicator()
+        indicator.start("Creating construction toy parts", len(specs))
+    objects = []
+    doc.openTransaction("Build parts")
+    try:
+        for i, spec in enumerate(specs):
+            objects.append(makeFeature(doc, spec.kind, spec.parameters, spec.placement, spec.name))
+            if indicator is not None:
+                indicator.next()
+            else:
+                progress(i + 1, len(specs))
+    finally:
+        doc.commitTransaction()
+        if indicator is not None:
+            indicator.stop()
+    doc.recompute()
+    if fit and App.GuiUp:
+        import FreeCADGui as Gui
+        Gui.SendMsgToActiveView("ViewFit")
+    return objects
+
+
+def specsFromJson(text):
+    """parses a JSON list of {"type", "parameters", "placement", "name"}
+    entries into PartSpec objects"""
+    return [PartSpec(entry["type"], entry.get("parameters"), entry.get("placement"), entry.get("name"))
+            for entry in json.loads(text)]
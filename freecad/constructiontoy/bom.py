@@ -0,0 +1,148 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""bill of materials and mass properties of a kit
+
+Volumes come from the shape cache when the real shape of a spec happens
+to be built already, otherwise from the closed forms in core.py. Only
+properties are read, nothing is recomputed, so the report stays cheap on
+documents with thousands of parts.
+"""
+
+import csv, json
+from collections import OrderedDict, namedtuple
+
+from . import core, shapecache
+from .instances import iterParts
+from .preferences import getParameters
+
+__all__ = ["BomLine", "density", "partVolume", "billOfMaterials", "totals",
+           "writeCsv", "writeJson", "writeReport"]
+
+# g/cm3, ABS
+DENSITY = 1.04
+
+BomLine = namedtuple("BomLine", ["kind", "parameters", "count", "volume", "mass", "source"])
+
+
+def density():
+    """material density in g/cm3, from the Density preference"""
+    return getParameters().GetFloat("Density", DENSITY)
+
+
+def volumeKey(obj):
+    """shape cache key of the physical part, screws always have real threads"""
+    proxy = obj.Proxy
+    key = proxy.shapeKey(obj)
+    if hasattr(proxy, "levelOfDetail"):
+        from .features import REAL_THREAD
+        key = key[:-1] + (REAL_THREAD,)
+    return key
+
+
+def partVolume(obj):
+    """(volume in mm3, "cache" or "analytic") of a construction toy part.
+    Results are kept in shapecache.volumeCache, which shapecache.clear()
+    empties along with the shapes"""
+    key = volumeKey(obj)
+    known = shapecache.volumeCache.get(key, copy=False)
+    if known is not None and known[1] == "cache":
+        return known
+    shape = shapecache.peek(key)
+    if shape is not None:
+        # the volume of a threaded shape is not cheap, it is computed once
+        result = (shape.Volume, "cache")
+    elif known is not None:
+        return known
+    else:
+        proxy = obj.Proxy
+        parameters = dict((name, getattr(obj, name)) for name in core.DEFAULTS[proxy.kind])
+        result = (core.volume(core.describe(proxy.kind, parameters)), "analytic")
+    shapecache.volumeCache.put(key, result, copy=False)
+    return result
+
+
+def billOfMaterials(doc):
+    """one BomLine per distinct spec of doc, links and link arrays counted
+    with their prototype. Volumes are in mm3, masses in g, both per part"""
+    groups = OrderedDict()
+    for label, prototype, placement in iterParts(doc):
+        proxy = prototype.Proxy
+        key = (proxy.kind,) + proxy.parameters(prototype)
+        if key not in groups:
+            groups[key] = [prototype, 0]
+        groups[key][1] += 1
+
+    rho = density()
+    lines = []
+    for prototype, count in groups.values():
+        kind = prototype.Proxy.kind
+        parameters = core.partParameters(kind, dict((name, getattr(prototype, name))
+                                                    for name in core.DEFAULTS[kind]))
+        volume, source = partVolume(prototype)
+        lines.append(BomLine(kind, parameters, count, volume, volume * rho / 1000.0, source))
+    return lines
+
+
+def totals(lines):
+    """{kind: (count, volume, mass)} summed over lines, with an "all" entry"""
+    result = OrderedDict()
+    for line in lines:
+        for kind in (line.kind, "all"):
+            count, volume, mass = result.get(kind, (0, 0.0, 0.0))
+            result[kind] = (count + line.count, volume + line.count * line.volume,
+                            mass + line.count * line.mass)
+    return result
+
+
+def writeCsv(lines, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["kind", "count", "parameters", "volume mm3", "mass g",
+                         "total volume mm3", "total mass g", "source"])
+        for line in lines:
+            parameters = " ".join("{0}={1}".format(name, value)
+                                  for name, value in sorted(line.parameters.items()))
+            writer.writerow([line.kind, line.count, parameters,
+                             "{0:.3f}".format(line.volume), "{0:.3f}".format(line.mass),
+                             "{0:.3f}".format(line.count * line.volume),
+                             "{0:.3f}".format(line.count * line.mass), line.source])
+
+
+def writeJson(lines, path):
+    report = {"density": density(),
+              "parts": [dict(line._asdict(), totalvolume=line.count * line.volume,
+                             totalmass=line.count * line.mass) for line in lines],
+              "totals": dict((kind, {"count": count, "volume": volume, "mass": mass})
+                             for kind, (count, volume, mass) in totals(lines).items())}
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+
+
+def writeReport(doc, path):
+    """writes the bill of materials of doc as CSV or, for a .json path, as
+    JSON. Returns the totals"""
+    lines = billOfMaterials(doc)
+    if path.lower().endswith(".json"):
+        writeJson(lines, path)
+    else:
+        writeCsv(lines, path)
+    return totals(lines)
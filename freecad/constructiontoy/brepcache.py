@@ -0,0 +1,156 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+import os, mmap
+
+import FreeCAD as App
+import Part
+
+from .preferences import getParameters
+from .shapecache import normalize, fingerprint
+
+__all__ = ["BrepCache", "getBrepCache", "setBrepCache", "fetch", "clear"]
+
+class BrepCache(object):
+
+    """ disk cache of serialized BREP shapes with LRU eviction
+
+    Entries are files named after a content hash of their key. Reading an
+    entry updates its modification time, which is what eviction sorts on.
+    """
+
+    def __init__(self, directory, maxbytes):
+        self.directory = directory
+        self.maxbytes = maxbytes
+
+    def path(self, key):
+        # the fingerprint covers shapecache.GEOMETRY_VERSION, entries of
+        # older generators are never read again and age out
+        return os.path.join(self.directory, fingerprint(normalize(key)) + ".brep")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    brep = data[:].decode("ascii")
+                finally:
+                    data.close()
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        shape = Part.Shape()
+        try:
+            shape.importBrepFromString(brep)
+        except Exception:
+            return None
+        if shape.isNull():
+            return None
+        return shape
+
+    def put(self, key, shape):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        path = self.path(key)
+        tmp = path + ".tmp" + str(os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(shape.exportBrepToString().encode("ascii"))
+        os.replace(tmp, path)
+        self.evict()
+
+    def fetch(self, key, build):
+        shape = self.get(key)
+        if shape is None:
+            shape = build()
+            try:
+                self.put(key, shape)
+            except (IOError, OSError) as e:
+                App.Console.PrintWarning("construction toy: cannot write brep cache: " + str(e) + "\n")
+        return shape
+
+    def evict(self):
+        """removes the least recently used entries until the cache fits maxbytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".brep"):
+                continue
+            st = os.stat(os.path.join(self.directory, name))
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self.maxbytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".brep"):
+                os.remove(os.path.join(self.directory, name))
+
+
+_brepCache = None
+
+
+def getBrepCache():
+    """returns the workbench brep cache, or None if it is disabled"""
+    global _brepCache
+    param = getParameters()
+    if not param.GetBool("BrepCache", True):
+        return None
+    if _brepCache is None:
+        directory = os.path.join(App.getUserAppDataDir(), "ConstructionToy", "brepcache")
+        _brepCache = BrepCache(directory, param.GetInt("BrepCacheSize", 512) * 1024 * 1024)
+    return _brepCache
+
+
+def setBrepCache(cache):
+    """replaces the workbench brep cache, for instance by one in a scratch
+    directory, and returns the previous one. None goes back to the cache
+    configured in the preferences"""
+    global _brepCache
+    previous = _brepCache
+    _brepCache = cache
+    return previous
+
+
+def fetch(key, build):
+    """returns the shape stored on disk for key, calling build() on a miss"""
+    cache = getBrepCache()
+    if cache is None:
+        return build()
+    return cache.fetch(key, build)
+
+
+def clear():
+    cache = getBrepCache()
+    if cache is not None:
+        cache.clear()
@@ -0,0 +1,226 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""clash and alignment checking of assembled kits
+
+Parts are indexed by the world bounding boxes their parameters give, in a
+uniform grid. Only parts sharing a grid cell and overlapping boxes are
+candidates; screws are checked against plate holes and separator bores
+analytically, exact OCC booleans are left for the remaining candidates.
+"""
+
+from __future__ import division
+import math
+from collections import namedtuple
+
+import FreeCAD as App
+
+from . import core, shapecache
+from .instances import iterParts
+
+__all__ = ["collectParts", "GridIndex", "checkKit", "ClashReport"]
+
+# an instance of a construction toy part in the world
+KitPart = namedtuple("KitPart", ["label", "prototype", "placement", "kind", "geometry", "box"])
+
+# distances below this are considered coincident, in mm
+TOLERANCE = 1e-3
+
+
+def partGeometry(obj):
+    """core description of the parameters of obj"""
+    proxy = obj.Proxy
+    parameters = dict((name, getattr(obj, name)) for name in core.DEFAULTS[proxy.kind])
+    return core.describe(proxy.kind, parameters)
+
+
+def worldBox(localbox, placement):
+    """axis aligned world box of a local (min, max) box"""
+    (x0, y0, z0), (x1, y1, z1) = localbox
+    corners = [placement.multVec(App.Vector(x, y, z))
+               for x in (x0, x1) for y in (y0, y1) for z in (z0, z1)]
+    return ((min(c.x for c in corners), min(c.y for c in corners), min(c.z for c in corners)),
+            (max(c.x for c in corners), max(c.y for c in corners), max(c.z for c in corners)))
+
+
+def collectParts(doc):
+    """every construction toy part of doc, links and link arrays included"""
+    stub = core.StubBackend()
+    geometries = {}
+    parts = []
+    for label, prototype, placement in iterParts(doc):
+        if prototype.Name not in geometries:
+            geometry = partGeometry(prototype)
+            geometries[prototype.Name] = (geometry, stub.build(geometry).boundbox)
+        geometry, localbox = geometries[prototype.Name]
+        parts.append(KitPart(label, prototype, placement, prototype.Proxy.kind, geometry,
+                             worldBox(localbox, placement)))
+    return parts
+
+
+def boxesOverlap(a, b):
+    return all(a[0][i] < b[1][i] - TOLERANCE and b[0][i] < a[1][i] - TOLERANCE for i in range(3))
+
+
+class GridIndex(object):
+
+    """ uniform grid over world boxes returning candidate pairs"""
+
+    def __init__(self, boxes, cellsize=None):
+        self.boxes = boxes
+        if cellsize is None:
+            # the median box size keeps big plates from dominating the grid
+            sizes = sorted(max(b[1][i] - b[0][i] for i in range(3)) for b in boxes) or [1.0]
+            cellsize = max(sizes[len(sizes)//2], TOLERANCE)
+        self.cellsize = cellsize
+        self.cells = {}
+        for index, box in enumerate(boxes):
+            for cell in self._cells(box):
+                self.cells.setdefault(cell, []).append(index)
+
+    def _cells(self, box):
+        lo = [int(math.floor(v / self.cellsize)) for v in box[0]]
+        hi = [int(math.floor(v / self.cellsize)) for v in box[1]]
+        for i in range(lo[0], hi[0] + 1):
+            for j in range(lo[1], hi[1] + 1):
+                for k in range(lo[2], hi[2] + 1):
+                    yield (i, j, k)
+
+    def pairs(self):
+        """index pairs (i, j), i < j, of overlapping boxes"""
+        seen = set()
+        for members in self.cells.values():
+            for n, i in enumerate(members):
+                for j in members[n+1:]:
+                    pair = (i, j) if i < j else (j, i)
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+                    if boxesOverlap(self.boxes[i], self.boxes[j]):
+                        yield pair
+
+
+class ClashReport(object):
+
+    """ misaligned screws and interfering parts of a kit"""
+
+    def __init__(self):
+        self.aligned = []        # (screw, part) labels
+        self.misaligned = []     # (screw, part, offset of the axis from the hole in mm)
+        self.interferences = []  # (part, part, common volume in mm3)
+
+    def __str__(self):
+        lines = ["{0} screws aligned with holes".format(len(self.aligned))]
+        for screw, part, offset in self.misaligned:
+            lines.append("misaligned: {0} is {1:.3f} mm off the hole of {2}".format(screw, offset, part))
+        for a, b, volume in self.interferences:
+            lines.append("interference: {0} and {1} share {2:.3f} mm3".format(a, b, volume))
+        if not self.misaligned and not self.interferences:
+            lines.append("no misalignment or interference found")
+        return "\n".join(lines) + "\n"
+
+
+def screwHoleOffset(screw, part):
+    """distance between the screw axis and the nearest hole of part where
+    the axis crosses it, or None if the screw does not pass through part"""
+    inverse = part.placement.inverse()
+    top = inverse.multVec(screw.placement.multVec(App.Vector(0, 0, screw.geometry.headheight)))
+    tip = inverse.multVec(screw.placement.multVec(App.Vector(0, 0, -screw.geometry.height)))
+    axis = top.sub(tip)
+    if axis.Length < TOLERANCE:
+        return None
+    axis.normalize()
+    if abs(axis.z) < math.cos(math.radians(0.5)):
+        # crossing at an angle, the exact check decides
+        return None
+    g = part.geometry
+    middle = g.height / 2
+    if not min(tip.z, top.z) < middle < max(tip.z, top.z):
+        return None
+    t = (middle - tip.z) / (top.z - tip.z)
+    x = tip.x + t * (top.x - tip.x)
+    y = tip.y + t * (top.y - tip.y)
+    if isinstance(g, core.PlateGeometry):
+        if not (0 <= x <= g.xtotal and 0 <= y <= g.ytotal):
+            return None
+        i = min(int(x // g.xsize), g.xoccurrences - 1)
+        j = min(int(y // g.ysize), g.yoccurrences - 1)
+        return math.hypot(x - (i + 0.5) * g.xsize, y - (j + 0.5) * g.ysize)
+    offset = math.hypot(x, y)
+    return offset if offset < g.outerdiameter / 2 + screw.geometry.screwdiameter / 2 else None
+
+
+def checkShape(prototype):
+    """untransformed shape of prototype for the exact check. Screws shown
+    as bounding cylinders are checked with their cosmetic shape, their
+    envelope would clash with every hole"""
+    proxy = prototype.Proxy
+    if hasattr(proxy, "levelOfDetail"):
+        from .features import makeScrew, BOUNDING_CYLINDER, COSMETIC
+        if proxy.levelOfDetail(prototype) == BOUNDING_CYLINDER:
+            params = proxy.parameters(prototype)
+            return shapecache.fetch((proxy.kind,) + params + (COSMETIC,),
+                                    lambda: makeScrew(*params, lod=COSMETIC), copy=False)
+    return prototype.Shape
+
+
+def worldShape(part):
+    shape = checkShape(part.prototype).copy()
+    shape.Placement = part.placement
+    return shape
+
+
+def commonVolume(a, b):
+    return worldShape(a).common(worldShape(b)).Volume
+
+
+def checkKit(doc, exact=True, cellsize=None):
+    """checks the screws of doc against the holes they pass and all
+    candidate pairs for interference, returns a ClashReport"""
+    parts = collectParts(doc)
+    index = GridIndex([part.box for part in parts], cellsize)
+    report = ClashReport()
+    for i, j in index.pairs():
+        a, b = parts[i], parts[j]
+        if b.kind == "screw" and a.kind != "screw":
+            a, b = b, a
+        if a.kind == "screw" and b.kind != "screw":
+            offset = screwHoleOffset(a, b)
+            if offset is not None:
+                play = (b.geometry.holesize - a.geometry.screwdiameter) / 2
+                if play < -TOLERANCE:
+                    # the screw is wider than the hole, wherever it sits
+                    if exact:
+                        volume = commonVolume(a, b)
+                    else:
+                        volume = math.pi * ((a.geometry.screwdiameter / 2) ** 2 -
+                                            (b.geometry.holesize / 2) ** 2) * b.geometry.height
+                    report.interferences.append((a.label, b.label, volume))
+                elif offset <= play + TOLERANCE:
+                    report.aligned.append((a.label, b.label))
+                else:
+                    report.misaligned.append((a.label, b.label, offset))
+                continue
+        if exact:
+            volume = commonVolume(a, b)
+            if volume > TOLERANCE:
+                report.interferences.append((a.label, b.label, volume))
+    return report
@@ -22,7 +22,8 @@ import os
 import FreeCAD
 import FreeCADGui as Gui
 
-from .features import ViewProviderConstructionToy, plate, separator, washer, screw
+# commands only carry their icon and menu metadata, the features and the
+# geometry libraries behind them are imported on the first Activated
 
 
 class BaseCommand(object):
@@ -44,6 +45,7 @@ class CreatePlate(BaseCommand):
                 'ToolTip': 'create plate'}
 
     def Activated(self):
+        from .features import ViewProviderConstructionToy, plate
         a = FreeCAD.ActiveDocument.addObject("Part::FeaturePython", "Plate")
         plate(a)
         ViewProviderConstructionToy(a.ViewObject)
@@ -60,6 +62,7 @@ class CreateSeparator(BaseCommand):
                 'ToolTip': 'create separator'}  
 
     def Activated(self):
+        from .features import ViewProviderConstructionToy, separator
         a = FreeCAD.ActiveDocument.addObject("Part::FeaturePython", "Separator")
         separator(a)
         ViewProviderConstructionToy(a.ViewObject)
@@ -75,6 +78,7 @@ class CreateWasher(BaseCommand):
                 'ToolTip': 'create washer'}  
 
     def Activated(self):
+        from .features import ViewProviderConstructionToy, washer
         a = FreeCAD.ActiveDocument.addObject("Part::FeaturePython", "Washer")
         washer(a)
         ViewProviderConstructionToy(a.ViewObject)
@@ -90,8 +94,148 @@ class CreateScrew(BaseCommand):
                 'ToolTip': 'create screw'}  
 
     def Activated(self):
+        from .features import ViewProviderConstructionToy, screw
         a = FreeCAD.ActiveDocument.addObject("Part::FeaturePython", "Screw")
         screw(a)
         ViewProviderConstructionToy(a.ViewObject)
         FreeCAD.ActiveDocument.recompute()
         Gui.SendMsgToActiveView("ViewFit")
+
+class InstanceDuplicates(BaseCommand):
+    """replaces parts with identical parameters by instances of one prototype"""
+
+    def GetResources(self):
+        return {'Pixmap': os.path.join(os.path.dirname(__file__),  'icons', 'constructiontoyworkbench.svg'),
+                'MenuText': 'instance duplicates',
+                'ToolTip': 'replace parts with identical parameters by links to a single prototype'}
+
+    def Activated(self):
+        from .instances import instanceDuplicates
+        links = instanceDuplicates(FreeCAD.ActiveDocument)
+        FreeCAD.Console.PrintMessage("construction toy: " + str(len(links)) + " parts converted to instances\n")
+
+class CreateBatch(BaseCommand):
+    """creates all parts listed in a JSON file with a single recompute"""
+
+    def GetResources(self):
+        return {'Pixmap': os.path.join(os.path.dirname(__file__),  'icons', 'constructiontoyworkbench.svg'),
+                'MenuText': 'create parts from file',
+                'ToolTip': 'create the parts of a JSON part list in one transaction and recompute'}
+
+    def Activated(self):
+        from PySide import QtGui
+        from .batch import buildBatch, specsFromJson
+        filename = QtGui.QFileDialog.getOpenFileName(Gui.getMainWindow(), "Part list", "", "JSON (*.json)")[0]
+        if not filename:
+            return
+        with open(filename) as f:
+            specs = specsFromJson(f.read())
+        buildBatch(specs, FreeCAD.ActiveDocument)
+
+class RegenerateParts(BaseCommand):
+    """regenerates all parts, building distinct parameter sets in parallel"""
+
+    def GetResources(self):
+        return {'Pixmap': os.path.join(os.path.dirname(__file__),  'icons', 'constructiontoyworkbench.svg'),
+                'MenuText': 'regenerate parts',
+                'ToolTip': 'rebuild all construction toy parts using a pool of worker processes'}
+
+    def Activated(self):
+        from .parallel import regenerate
+        built = regenerate(doc=FreeCAD.ActiveDocument)
+        FreeCAD.Console.PrintMessage("construction toy: " + str(built) + " distinct shapes built\n")
+
+class ProfileReport(BaseCommand):
+    """prints the per stage generation stats of the active document"""
+
+    def GetResources(self):
+        return {'Pixmap': os.path.join(os.path.dirname(__file__),  'icons', 'constructiontoyworkbench.svg'),
+                'MenuText': 'profile report',
+                'ToolTip': 'print the time spent in each geometry stage, profiling is enabled on first use'}
+
+    def Activated(self):
+        from . import profiling
+        if not profiling.isEnabled():
+            profiling.enable()
+            FreeCAD.Console.PrintMessage("construction toy: profiling enabled, recompute to collect stats\n")
+            return
+        FreeCAD.Console.PrintMessage(profiling.report(FreeCAD.ActiveDocument.Name))
+
+class ExportKit(BaseCommand):
+    """exports every distinct part once plus a manifest of all placements"""
+
+    def GetResources(self):
+        return {'Pixmap': os.path.join(os.path.dirname(__file__),  'icons', 'constructiontoyworkbench.svg'),
+                'MenuText': 'export kit',
+                'ToolTip': 'export each distinct part once as STEP or STL, with a manifest of the instances'}
+
+    def Activated(self):
+        from PySide import QtGui
+        from .export import exportKit
+        from .preferences import getParameters
+        directory = QtGui.QFileDialog.getExistingDirectory(Gui.getMainWindow(), "Export kit to")
+        if not directory:
+            return
+        manifest = exportKit(FreeCAD.ActiveDocument, directory,
+                             getParameters().GetString("ExportFormat", "step"))
+        FreeCAD.Console.PrintMessage("construction toy: kit exported, see " + manifest + "\n")
+
+class RebuildParts(BaseCommand):
+    """rebuilds all parts, ignoring stored and cached shapes"""
+
+    def GetResources(self):
+        return {'Pixmap': os.path.join(os.path.dirname(__file__),  'icons', 'constructiontoyworkbench.svg'),
+                'MenuText': 'force rebuild',
+                'ToolTip': 'rebuild every part from its parameters, ignoring shapes stored in the document'}
+
+    def Activated(self):
+        from .features import rebuildAll
+        rebuildAll(FreeCAD.ActiveDocument)
+
+class CheckKit(BaseCommand):
+    """reports screws missing their holes and interfering parts"""
+
+    def GetResources(self):
+        return {'Pixmap': os.path.join(os.path.dirname(__file__),  'icons', 'constructiontoyworkbench.svg'),
+                'MenuText': 'check kit',
+                'ToolTip': 'check that screws go through holes and that parts do not collide'}
+
+    def Activated(self):
+        from .clash import checkKit
+        FreeCAD.Console.PrintMessage(str(checkKit(FreeCAD.ActiveDocument)))
+
+class CreateKit(BaseCommand):
+    """builds a whole model from a JSON kit description"""
+
+    def GetResources(self):
+        return {'Pixmap': os.path.join(os.path.dirname(__file__),  'icons', 'constructiontoyworkbench.svg'),
+                'MenuText': 'create kit',
+                'ToolTip': 'build plates, stacks of separators and washers and screws from a kit file'}
+
+    def Activated(self):
+        from PySide import QtGui
+        from .kit import buildKit
+        filename = QtGui.QFileDialog.getOpenFileName(Gui.getMainWindow(), "Kit", "", "JSON (*.json)")[0]
+        if not filename:
+            return
+        with open(filename) as f:
+            buildKit(f.read(), FreeCAD.ActiveDocument)
+
+class BillOfMaterials(BaseCommand):
+    """writes part counts, volumes and masses of the active document"""
+
+    def GetResources(self):
+        return {'Pixmap': os.path.join(os.path.dirname(__file__),  'icons', 'constructiontoyworkbench.svg'),
+                'MenuText': 'bill of materials',
+                'ToolTip': 'write counts, volumes and masses of the distinct parts as CSV or JSON'}
+
+    def Activated(self):
+        from PySide import QtGui
+        from .bom import writeReport
+        filename = QtGui.QFileDialog.getSaveFileName(Gui.getMainWindow(), "Bill of materials", "",
+                                                     "CSV (*.csv);;JSON (*.json)")[0]
+        if not filename:
+            return
+        count, volume, mass = writeReport(FreeCAD.ActiveDocument, filename).get("all", (0, 0.0, 0.0))
+        FreeCAD.Console.PrintMessage("construction toy: {0} parts, {1:.1f} cm3, {2:.1f} g\n"
+                                     .format(count, volume / 1000.0, mass))
@@ -0,0 +1,299 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""dimensional and topological logic of the construction toy parts
+
+Nothing in here needs FreeCAD: the functions turn part parameters into
+lightweight geometry descriptions, which a backend then builds. The OCC
+backend (occbackend.py) makes real shapes, the stub backend below only
+computes what can be known without them and is meant for tests and for
+validating large bills of materials. Screw dimensions come from the
+vectorized screwgeometry module, so describing a screw needs numpy.
+"""
+
+from __future__ import division
+import math
+from collections import namedtuple
+
+__all__ = ["DEFAULTS", "length", "partParameters", "plateHoleCenters", "filletFits",
+           "screwParameters", "describe", "validate", "validateBillOfMaterials",
+           "revolvedVolume", "plateVolume", "ringVolume", "screwVolume", "volume",
+           "StubBackend", "registerBackend", "getBackend"]
+
+# head geometry constants of the toy screw
+HEAD_CHAMFER = 0.5      # c, height of the washer face under the hexagon
+FILLET = 0.5            # r, fillet between head and shank
+FLATS = 0.9             # s = FLATS * head diameter, width across flats
+WASHER = 1.5            # dw = WASHER * diameter
+THREAD_CREST = 1.0/8.0  # crest width of the thread ridge in pitches
+THREAD_OVERLAP = 0.02  # depth the ridge root is sunk into the core, in pitches
+
+# default parameters of each part type, lengths in mm
+DEFAULTS = {
+    "plate": {"xoccurrences": 3, "yoccurrences": 1, "xsize": 30.0, "ysize": 24.0,
+              "height": 5.0, "holesize": 11.0, "fillet": 1.0},
+    "separator": {"height": 32.0, "outerdiameter": 19.0, "holesize": 11.0, "fillet": 1.0},
+    "screw": {"height": 30.0, "shanklength": 0.0, "screwdiameter": 9.4, "screwpitch": 2.0,
+              "fillet": 1.0, "outerdiameter": 18.5, "headheight": 8.0, "internaldiameter": 9.4,
+              "crosswidth": 3.0, "crossdepth": 4.0, "chamfer": True},
+}
+# a washer is a short separator
+DEFAULTS["washer"] = dict(DEFAULTS["separator"], height=5.0)
+
+PlateGeometry = namedtuple("PlateGeometry", [
+    "xsize", "ysize", "height", "holesize", "fillet", "xoccurrences", "yoccurrences",
+    "xtotal", "ytotal", "holecenters"])
+RingGeometry = namedtuple("RingGeometry", [
+    "outerdiameter", "height", "holesize", "fillet"])
+ScrewGeometry = namedtuple("ScrewGeometry", [
+    "height", "screwpitch", "screwdiameter", "outerdiameter", "headheight",
+    "halfturns", "a", "offSet", "s", "dw", "cham", "cham_t"])
+
+_UNITS = {"mm": 1.0, "cm": 10.0, "m": 1000.0, "in": 25.4}
+
+
+def length(value):
+    """length in mm of a number, a quantity or a string like '30 mm'"""
+    if hasattr(value, "Value"):
+        return float(value.Value)
+    if isinstance(value, str):
+        text = value.strip()
+        for unit, factor in _UNITS.items():
+            if text.endswith(unit):
+                return float(text[:-len(unit)]) * factor
+        return float(text)
+    return float(value)
+
+
+def partParameters(kind, parameters=None):
+    """the defaults of kind updated with parameters, lengths converted to mm"""
+    if kind not in DEFAULTS:
+        raise ValueError("unknown construction toy part type: " + str(kind))
+    result = dict(DEFAULTS[kind])
+    for name, value in (parameters or {}).items():
+        default = DEFAULTS[kind].get(name)
+        if isinstance(default, bool):
+            result[name] = bool(value)
+        elif isinstance(default, int):
+            result[name] = int(value)
+        elif isinstance(default, float):
+            result[name] = length(value)
+        else:
+            result[name] = value
+    return result
+
+
+def plateHoleCenters(xsize, ysize, xoccurrences, yoccurrences):
+    return [(xsize/2 + i*xsize, ysize/2 + j*ysize)
+            for i in range(xoccurrences) for j in range(yoccurrences)]
+
+
+def plateWall(xsize, ysize, holesize):
+    """material between the plate border and the nearest hole"""
+    return (min(xsize, ysize) - holesize)/2
+
+
+def ringWall(outerdiameter, holesize):
+    return (outerdiameter - holesize)/2
+
+
+def filletFits(fillet, height, wall):
+    """True if a border fillet fits both the part height and the wall
+    between the border and the holes"""
+    return fillet < height/2 and fillet < wall
+
+
+def screwParameters(height, screwpitch, screwdiameter, outerdiameter, headheight):
+    """derived dimensions of one screw, the single spec case of the
+    vectorized screwgeometry.screwProfile"""
+    # numpy is only imported once a screw is described
+    from .screwgeometry import screwProfile
+    p = screwProfile(height, screwpitch, screwdiameter, outerdiameter, headheight)
+    return ScrewGeometry(height, screwpitch, screwdiameter, outerdiameter, headheight,
+                         int(p.halfturns[0]), float(p.a[0]), float(p.offSet[0]), float(p.s[0]),
+                         float(p.dw[0]), float(p.cham[0]), float(p.cham_t[0]))
+
+
+def describe(kind, parameters=None):
+    """geometry description of a part of the given type"""
+    p = partParameters(kind, parameters)
+    if kind == "plate":
+        return PlateGeometry(p["xsize"], p["ysize"], p["height"], p["holesize"], p["fillet"],
+                             p["xoccurrences"], p["yoccurrences"],
+                             p["xsize"] * p["xoccurrences"], p["ysize"] * p["yoccurrences"],
+                             plateHoleCenters(p["xsize"], p["ysize"],
+                                              p["xoccurrences"], p["yoccurrences"]))
+    if kind in ("separator", "washer"):
+        return RingGeometry(p["outerdiameter"], p["height"], p["holesize"], p["fillet"])
+    return screwParameters(p["height"], p["screwpitch"], p["screwdiameter"],
+                           p["outerdiameter"], p["headheight"])
+
+
+def validate(kind, parameters=None):
+    """list of the problems of a part spec, empty if it can be built"""
+    try:
+        g = describe(kind, parameters)
+    except (ValueError, TypeError) as e:
+        return [str(e)]
+    errors = []
+    if isinstance(g, PlateGeometry):
+        if g.xoccurrences < 1 or g.yoccurrences < 1:
+            errors.append("a plate needs at least one module in x and y")
+        if min(g.xsize, g.ysize, g.height, g.holesize) <= 0:
+            errors.append("plate sizes must be positive")
+        elif g.holesize >= min(g.xsize, g.ysize):
+            errors.append("hole does not fit the module")
+        elif g.fillet > 0 and not filletFits(g.fillet, g.height, plateWall(g.xsize, g.ysize, g.holesize)):
+            errors.append("fillet does not fit the plate")
+    elif isinstance(g, RingGeometry):
+        if min(g.outerdiameter, g.height, g.holesize) <= 0:
+            errors.append(kind + " sizes must be positive")
+        elif g.holesize >= g.outerdiameter:
+            errors.append("hole is not smaller than the outer diameter")
+        elif g.fillet > 0 and not filletFits(g.fillet, g.height, ringWall(g.outerdiameter, g.holesize)):
+            errors.append("fillet does not fit the " + kind)
+    else:
+        if min(g.height, g.screwpitch, g.screwdiameter, g.outerdiameter, g.headheight) <= 0:
+            errors.append("screw sizes must be positive")
+        elif g.height <= g.screwpitch:
+            errors.append("screw is not longer than one pitch")
+        elif g.s / math.sqrt(3.0) <= g.dw / 2.0:
+            errors.append("head is not wider than the washer face")
+    return errors
+
+
+def validateBillOfMaterials(entries):
+    """validates (kind, parameters) entries, each distinct spec once.
+    Returns {index: [problems]} for the invalid entries"""
+    results = {}
+    problems = {}
+    for index, (kind, parameters) in enumerate(entries):
+        key = (kind, tuple(sorted((parameters or {}).items())))
+        if key not in results:
+            results[key] = validate(kind, parameters)
+        if results[key]:
+            problems[index] = results[key]
+    return problems
+
+
+def revolvedVolume(points):
+    """volume of a closed (x, z) polygon revolved around the z axis, the
+    sum of the frustums under its edges"""
+    v = 0.0
+    for (x0, z0), (x1, z1) in zip(points, points[1:] + points[:1]):
+        v += (x0*x0 + x0*x1 + x1*x1) * (z0 - z1)
+    return abs(v) * math.pi/3
+
+
+def spandrel(f):
+    """(area, centroid offset from the corner) of the region a fillet of
+    radius f removes from or adds to a square corner"""
+    return (1 - math.pi/4) * f*f, f * (10 - 3*math.pi) / (3*(4 - math.pi))
+
+
+def plateVolume(g):
+    """box with all 12 edges filleted, less the holes"""
+    r = g.fillet if g.fillet > 0 and filletFits(g.fillet, g.height, plateWall(g.xsize, g.ysize, g.holesize)) else 0.0
+    a, b, c = g.xtotal - 2*r, g.ytotal - 2*r, g.height - 2*r
+    box = a*b*c + 2*r*(a*b + a*c + b*c) + math.pi*r*r*(a + b + c) + 4.0/3.0*math.pi*r**3
+    return box - len(g.holecenters) * math.pi * (g.holesize/2)**2 * g.height
+
+
+def ringVolume(g):
+    """tube with its two outer edges filleted"""
+    R = g.outerdiameter/2
+    v = math.pi * (R*R - (g.holesize/2)**2) * g.height
+    if g.fillet > 0 and filletFits(g.fillet, g.height, ringWall(g.outerdiameter, g.holesize)):
+        area, offset = spandrel(g.fillet)
+        # Pappus, once for the top and once for the bottom edge
+        v -= 2 * 2*math.pi * (R - offset) * area
+    return v
+
+
+def screwVolume(g):
+    """real thread screw volume. The hexagon is exact on its prism and
+    approximate on the top chamfer, the thread ridge is taken as uniform
+    over the threaded length"""
+    c = HEAD_CHAMFER
+    r = FILLET
+    d = g.screwdiameter/2
+    corner = g.s / math.sqrt(3.0)
+    # the part of the revolved head profile the hexagon tool trims
+    hexagon = revolvedVolume([(0.0, g.headheight), (g.s/2, g.headheight),
+                              (corner, g.headheight - g.cham), (corner, c), (0.0, c)])
+    head = hexagon * 3*math.sqrt(3.0) / (2*math.pi) + math.pi * (g.dw/2)**2 * c
+    area, offset = spandrel(r)
+    head += 2*math.pi * (d + offset) * area + math.pi * d*d * r
+
+    # core and ridge of the thread, the way thread.makeThread builds them
+    P = g.screwpitch
+    depth = g.cham_t
+    rmin = d - depth
+    threaded = g.height - r
+    tip = min(depth, rmin/2)
+    shank = math.pi * rmin*rmin * threaded - revolvedVolume([(rmin - tip, 0.0), (rmin, 0.0), (rmin, tip)])
+    crest = THREAD_CREST * P
+    root = crest + 2*depth*math.tan(math.radians(30))
+    ridge = (crest + root)/2 * depth
+    centroid = rmin + depth * (root + 2*crest) / (3*(root + crest))
+    shank += ridge / P * 2*math.pi * centroid * max(threaded - tip, 0.0)
+    return head + shank
+
+
+def volume(geometry):
+    """volume in mm3 of a part described by describe()"""
+    if isinstance(geometry, PlateGeometry):
+        return plateVolume(geometry)
+    if isinstance(geometry, RingGeometry):
+        return ringVolume(geometry)
+    return screwVolume(geometry)
+
+
+StubShape = namedtuple("StubShape", ["kind", "boundbox", "holes"])
+
+
+class StubBackend(object):
+
+    """ backend building bounding boxes instead of shapes"""
+
+    def build(self, geometry):
+        if isinstance(geometry, PlateGeometry):
+            return StubShape("plate", ((0.0, 0.0, 0.0), (geometry.xtotal, geometry.ytotal, geometry.height)),
+                             len(geometry.holecenters))
+        if isinstance(geometry, RingGeometry):
+            r = geometry.outerdiameter/2
+            return StubShape("separator", ((-r, -r, 0.0), (r, r, geometry.height)), 1)
+        r = max(geometry.s / math.sqrt(3.0), geometry.screwdiameter/2)
+        return StubShape("screw", ((-r, -r, -geometry.height), (r, r, geometry.headheight)), 0)
+
+
+_backends = {"stub": StubBackend}
+
+
+def registerBackend(name, factory):
+    _backends[name] = factory
+
+
+def getBackend(name="stub"):
+    """returns a backend instance, "occ" builds FreeCAD shapes"""
+    if name == "occ" and name not in _backends:
+        from . import occbackend
+    return _backends[name]()
@@ -0,0 +1,120 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+import os, json, struct, hashlib
+from collections import OrderedDict
+
+import FreeCAD as App
+
+from .instances import iterParts
+from .preferences import getParameters
+from .shapecache import normalize
+
+__all__ = ["collectInstances", "exportKit", "writeStl"]
+
+
+def exportKey(obj):
+    """key of the exported geometry, the kind and the parameters of obj.
+    Screws are exported with real threads whatever their level of detail,
+    washers stay apart from the separators they share their shape with"""
+    proxy = obj.Proxy
+    return (proxy.kind,) + proxy.parameters(obj)
+
+
+def collectInstances(doc):
+    """groups the construction toy parts of doc, including links and link
+    arrays to them, as {export key: (prototype, [global placements])}"""
+    groups = OrderedDict()
+    for label, prototype, placement in iterParts(doc):
+        key = exportKey(prototype)
+        if key not in groups:
+            groups[key] = (prototype, [])
+        groups[key][1].append(placement)
+    return groups
+
+
+def writeStl(shape, path, deflection):
+    """tessellates shape and streams it to a binary STL file"""
+    points, triangles = shape.tessellate(deflection)
+    with open(path, "wb") as f:
+        f.write(b"construction toy".ljust(80, b" "))
+        f.write(struct.pack("<I", len(triangles)))
+        for i, j, k in triangles:
+            a, b, c = points[i], points[j], points[k]
+            normal = (b - a).cross(c - a)
+            if normal.Length > 0:
+                normal.normalize()
+            f.write(struct.pack("<12fH", normal.x, normal.y, normal.z,
+                                a.x, a.y, a.z, b.x, b.y, b.z, c.x, c.y, c.z, 0))
+
+
+def exportShape(obj):
+    """the untransformed geometry of obj as it should be exported"""
+    proxy = obj.Proxy
+    if hasattr(proxy, "exportShape"):
+        shape = proxy.exportShape(obj)
+    else:
+        shape = obj.Shape.copy()
+    shape.Placement = App.Placement()
+    return shape
+
+
+def exportKit(doc, directory, format="step", deflection=None, progress=None):
+    """writes every distinct part geometry of doc once, as STEP or STL, and
+    a manifest.json listing the placements of all instances of each part.
+
+    Parts are written one at a time and their shapes released right after,
+    so memory does not grow with the size of the kit. progress, if given,
+    is called as progress(done, total). Returns the manifest path.
+    """
+    format = format.lower()
+    if format not in ("step", "stl"):
+        raise ValueError("unsupported export format: " + format)
+    if deflection is None:
+        deflection = getParameters().GetFloat("ExportDeflection", 0.1)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    groups = collectInstances(doc)
+    parts = []
+    for done, (key, (prototype, placements)) in enumerate(groups.items()):
+        digest = hashlib.sha1(repr(normalize(key)).encode("utf-8")).hexdigest()[:12]
+        filename = "{0}-{1}.{2}".format(key[0], digest, format)
+        shape = exportShape(prototype)
+        if format == "step":
+            shape.exportStep(os.path.join(directory, filename))
+        else:
+            writeStl(shape, os.path.join(directory, filename), deflection)
+        del shape
+        parts.append({"file": filename,
+                      "type": key[0],
+                      "parameters": list(key[1:]),
+                      "count": len(placements),
+                      "placements": [{"position": list(p.Base), "rotation": list(p.Rotation.Q)}
+                                     for p in placements]})
+        if progress is not None:
+            progress(done + 1, len(groups))
+
+    manifest = os.path.join(directory, "manifest.json")
+    with open(manifest, "w") as f:
+        json.dump({"document": doc.Name, "format": format, "deflection": deflection,
+                   "parts": parts}, f, indent=1)
+    return manifest
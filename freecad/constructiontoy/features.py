@@ -22,17 +22,17 @@
 from __future__ import division
 import os, math
 
-import numpy as np
-import screw_maker2_2
-
 import FreeCAD as App
 
 from FreeCAD import Base
 
 import Part
-from Part import BSplineCurve, Shape, Wire, Face, makePolygon, \
-    BRepOffsetAPI, Shell, makeLoft, Solid, LineSegment, BSplineSurface, makeCompound,\
-     show, makePolygon, makeHelix, makeSweepSurface, makeShell, makeSolid
+from Part import Wire, LineSegment
+
+# numpy (through screwgeometry) and the thread generators are imported on
+# the first screw build, loading a document of plates does not need them
+from . import core, shapecache, brepcache, profiling
+from .preferences import getParameters
 
 __all__=["plate", "separator", "washer", "screw"]
 
@@ -43,10 +43,499 @@ def fcvec(x):
     else:
         return(App.Vector(x[0], x[1], x[2]))
 
+
+def borderEdges(shape, tolerance=1e-6):
+    """straight edges lying on the sides of the bounding box of shape, for a
+    plate these are its 12 perimeter edges and never hole edges"""
+    box = shape.BoundBox
+    edges = []
+    for edge in shape.Edges:
+        if not isinstance(edge.Curve, (Part.Line, Part.LineSegment)):
+            continue
+        eb = edge.BoundBox
+        if eb.XMax <= box.XMin + tolerance or eb.XMin >= box.XMax - tolerance or \
+                eb.YMax <= box.YMin + tolerance or eb.YMin >= box.YMax - tolerance:
+            edges.append(edge)
+    return edges
+
+
+def circularEdges(shape, radius, tolerance=1e-6):
+    """circle edges of the given radius, for a separator the top and bottom
+    outer edges"""
+    return [edge for edge in shape.Edges
+            if isinstance(edge.Curve, Part.Circle) and abs(edge.Curve.Radius - radius) < tolerance]
+
+
+def canFillet(fillet, height, wall):
+    """cheap check that a border fillet fits both the part height and the
+    wall between the border and the holes, makeFillet is slow to fail"""
+    if core.filletFits(fillet, height, wall):
+        return True
+    App.Console.PrintWarning("construction toy: fillet radius " + str(fillet) +
+                             " does not fit the part, fillet skipped\n")
+    return False
+
+
+def stageKey(stages, name, args):
+    """cache key of an intermediate stage, made of the stage name and the
+    values of the properties the stage depends on"""
+    return (name,) + shapecache.normalize([args[prop] for prop in stages[name]])
+
+
+def fetchStage(stages, name, args, build):
+    """returns the shared result of a stage, building it only when one of
+    its properties changed. Stage results must not be modified"""
+    return shapecache.stageCache.fetch(stageKey(stages, name, args), build, copy=False)
+
+
+def staleStages(obj):
+    """names of the stages of obj that its next execute() has to rebuild"""
+    proxy = obj.Proxy
+    stages = getattr(proxy, "stages", {})
+    names = proxy.stageNames(obj) if hasattr(proxy, "stageNames") else list(stages)
+    args = dict((prop, getattr(obj, prop)) for props in stages.values() for prop in props)
+    return [name for name in names if stageKey(stages, name, args) not in shapecache.stageCache]
+
+
+# plates with more holes than this are drilled with one boolean cut of a
+# patterned hole tool, a face with one inner wire per hole does not scale
+PLATE_FACE_HOLES = 64
+
+
+# stages of the plate and the properties they depend on, the face path
+# uses the first two, the patterned path the last two
+PLATE_STAGES = {
+    "plate face": ("xsize", "ysize", "holesize", "xoccurrences", "yoccurrences"),
+    "plate extrusion": ("xsize", "ysize", "height", "holesize", "xoccurrences", "yoccurrences"),
+    "plate block": ("xsize", "ysize", "height", "holesize", "fillet",
+                    "xoccurrences", "yoccurrences"),
+    "plate holes": ("xsize", "ysize", "height", "holesize",
+                    "xoccurrences", "yoccurrences"),
+}
+
+
+def usePlateFace(xoccurrences, yoccurrences):
+    """True if a plate is drilled through the inner wires of its face"""
+    limit = getParameters().GetInt("PlateFaceHoles", PLATE_FACE_HOLES)
+    return xoccurrences * yoccurrences <= limit
+
+
+def makePlate(xsize, ysize, height, holesize, fillet, xoccurrences, yoccurrences):
+    """builds a plate, choosing the hole strategy by the number of holes"""
+    if usePlateFace(xoccurrences, yoccurrences):
+        return makePlateFace(xsize, ysize, height, holesize, fillet, xoccurrences, yoccurrences)
+    return makePlatePattern(xsize, ysize, height, holesize, fillet, xoccurrences, yoccurrences)
+
+
+def makePlateFace(xsize, ysize, height, holesize, fillet, xoccurrences, yoccurrences):
+    """extrudes a face carrying all holes as inner wires"""
+    args = dict(xsize=xsize, ysize=ysize, height=height, holesize=holesize, fillet=fillet,
+                xoccurrences=xoccurrences, yoccurrences=yoccurrences)
+
+    def makeFace():
+        xtotal = xsize * xoccurrences
+        ytotal = ysize * yoccurrences
+
+        #App.Console.PrintMessage("xtotal,ytotal:" + str(xtotal) + "," + str(ytotal) + "\n")
+
+        e1 = LineSegment(App.Vector(0, 0, 0), App.Vector(xtotal, 0, 0)).toShape().Edges[0]
+        e2 = LineSegment(App.Vector(xtotal, 0, 0), App.Vector(xtotal, ytotal, 0)).toShape().Edges[0]
+        e3 = LineSegment(App.Vector(xtotal, ytotal, 0), App.Vector(0, ytotal, 0)).toShape().Edges[0]
+        e4 = LineSegment(App.Vector(0, ytotal, 0), App.Vector(0, 0, 0)).toShape().Edges[0]
+        w = Wire([e1, e2, e3, e4])
+
+        #hole
+        holes = []
+        for x, y in core.plateHoleCenters(xsize, ysize, xoccurrences, yoccurrences):
+            holes.append(Part.Wire(Part.makeCircle(holesize/2, App.Vector(x, y, 0),App.Vector(0, 0, -1))))
+
+        return profiling.timed("plate", "face", Part.Face, [w] + holes)
+
+    def makeExtrusion():
+        face = fetchStage(PLATE_STAGES, "plate face", args, makeFace)
+        return profiling.timed("plate", "extrude", face.extrude, App.Vector(0, 0, height))
+
+    baseshape = fetchStage(PLATE_STAGES, "plate extrusion", args, makeExtrusion)
+    if fillet > 0 and canFillet(fillet, height, core.plateWall(xsize, ysize, holesize)):
+        return profiling.timed("plate", "fillet", baseshape.makeFillet, fillet, borderEdges(baseshape))
+    else:
+        # stage results are shared and must not end up as a part shape
+        return baseshape.copy()
+
+
+def makePlatePattern(xsize, ysize, height, holesize, fillet, xoccurrences, yoccurrences):
+    """fillets the plain block first, then cuts a compound of translated
+    copies of a single hole tool in one boolean operation"""
+    args = dict(xsize=xsize, ysize=ysize, height=height, holesize=holesize, fillet=fillet,
+                xoccurrences=xoccurrences, yoccurrences=yoccurrences)
+
+    def makeBlock():
+        block = Part.makeBox(xsize * xoccurrences, ysize * yoccurrences, height)
+        if fillet > 0 and canFillet(fillet, height, core.plateWall(xsize, ysize, holesize)):
+            block = profiling.timed("plate", "fillet", block.makeFillet, fillet, block.Edges)
+        return block
+
+    def makeHoles():
+        tool = Part.makeCylinder(holesize/2, height + 2.0, App.Vector(0, 0, -1.0))
+        # translated copies share the hole geometry, only their location differs
+        tools = [tool.translated(App.Vector(x, y, 0))
+                 for x, y in core.plateHoleCenters(xsize, ysize, xoccurrences, yoccurrences)]
+        return Part.makeCompound(tools)
+
+    block = fetchStage(PLATE_STAGES, "plate block", args, makeBlock)
+    holes = fetchStage(PLATE_STAGES, "plate holes", args,
+                       lambda: profiling.timed("plate", "hole tools", makeHoles))
+    return profiling.timed("plate", "cut holes", block.cut, holes)
+
+
+def makeSeparator(outerdiameter, height, holesize, fillet):
+    w = Part.Wire(Part.makeCircle(outerdiameter/2))
+    #hole
+    h = Part.Wire(Part.makeCircle(holesize/2, App.Vector(0, 0, 0), App.Vector(0, 0, -1)))
+
+    face = Part.Face([w, h])
+
+    baseshape = profiling.timed("separator", "extrude", face.extrude, App.Vector(0, 0, height))
+
+    if fillet > 0 and canFillet(fillet, height, core.ringWall(outerdiameter, holesize)):
+        return profiling.timed("separator", "fillet", baseshape.makeFillet,
+                               fillet, circularEdges(baseshape, outerdiameter/2))
+    else:
+        return baseshape
+
+
+# screw levels of detail, "Document" defers to the document setting
+LEVELS_OF_DETAIL = ["Document", "Bounding cylinder", "Cosmetic", "Real thread"]
+BOUNDING_CYLINDER, COSMETIC, REAL_THREAD = LEVELS_OF_DETAIL[1:]
+LOD_META_KEY = "ConstructionToyLevelOfDetail"
+
+
+def documentLevelOfDetail(doc):
+    """screw level of detail of doc, falling back to the LevelOfDetail
+    preference, which defaults to cosmetic threads"""
+    lod = doc.Meta.get(LOD_META_KEY) if doc is not None else None
+    if lod not in LEVELS_OF_DETAIL[1:]:
+        lod = getParameters().GetString("LevelOfDetail", COSMETIC)
+    if lod not in LEVELS_OF_DETAIL[1:]:
+        lod = COSMETIC
+    return lod
+
+
+def setDocumentLevelOfDetail(doc, lod):
+    """sets the level of detail used by the screws of doc that follow the
+    document setting, and recomputes them"""
+    if lod not in LEVELS_OF_DETAIL[1:]:
+        raise ValueError("unknown level of detail: " + str(lod))
+    meta = doc.Meta
+    meta[LOD_META_KEY] = lod
+    doc.Meta = meta
+    for obj in doc.Objects:
+        if isinstance(getattr(obj, "Proxy", None), screw) and obj.LevelOfDetail == "Document":
+            obj.touch()
+    doc.recompute()
+
+
+# real threads are made with screw_maker2_2 unless the ThreadGenerator
+# preference selects the built-in generator of thread.py
+THREAD_GENERATORS = ["screw_maker2_2", "builtin"]
+SCREW_MAKER, BUILTIN_THREAD = THREAD_GENERATORS
+_missingScrewMaker = False
+
+
+def screwMaker():
+    """imports the screw_maker2_2 module the screw threads are made with"""
+    try:
+        import screw_maker2_2
+    except ImportError:
+        raise ImportError("construction toy screws need the screw_maker2_2 module, "
+                          "put screw_maker2_2.py on the FreeCAD Python path")
+    return screw_maker2_2
+
+
+def threadGenerator():
+    """the generator of real threads, from the ThreadGenerator preference.
+    Without screw_maker2_2 the built-in generator is used"""
+    global _missingScrewMaker
+    generator = getParameters().GetString("ThreadGenerator", SCREW_MAKER)
+    if generator != BUILTIN_THREAD and not _missingScrewMaker:
+        try:
+            screwMaker()
+            return SCREW_MAKER
+        except ImportError as e:
+            _missingScrewMaker = True
+            App.Console.PrintWarning(str(e) + ", using the built-in thread generator\n")
+    return BUILTIN_THREAD
+
+
+def makeScrewEnvelope(height, screwdiameter, outerdiameter, headheight):
+    """bounding cylinders of head and shank, for display of huge kits"""
+    corner = core.FLATS * outerdiameter / math.sqrt(3.0)
+    head = Part.makeCylinder(corner, headheight)
+    shank = Part.makeCylinder(screwdiameter/2.0, height, App.Vector(0, 0, -height))
+    return Part.makeCompound([head, shank])
+
+
+# stages of the screw and the properties they depend on, the final
+# boolean depends on all of them and is keyed by the screw shape key
+SCREW_STAGES = {
+    "screw hextool": ("outerdiameter", "headheight"),
+    "screw head": ("screwdiameter", "outerdiameter", "headheight"),
+    "screw thread": ("height", "screwpitch", "screwdiameter"),
+    "screw maker head": ("screwdiameter", "outerdiameter", "headheight"),
+    "screw maker thread": ("height", "screwpitch", "screwdiameter"),
+}
+
+
+def makeScrew(height, screwpitch, screwdiameter, outerdiameter, headheight, lod=REAL_THREAD,
+              generator=None):
+
+    if lod == BOUNDING_CYLINDER:
+        return makeScrewEnvelope(height, screwdiameter, outerdiameter, headheight)
+
+    from . import screwgeometry, thread
+
+    l = height
+    P = screwpitch
+    dia = screwdiameter
+    e = outerdiameter
+    k = headheight
+    r = core.FILLET
+
+    args = dict(height=height, screwpitch=screwpitch, screwdiameter=screwdiameter,
+                outerdiameter=outerdiameter, headheight=headheight)
+
+    profile = screwgeometry.screwProfile(l, P, dia, e, k)
+    halfturns = int(profile.halfturns[0])
+    a = float(profile.a[0])
+    offSet = float(profile.offSet[0])
+    s = float(profile.s[0])
+
+    #Head Points  Usage of k, s, cham, c, dw, dia, r, a
+    Pnt0, Pnt2, Pnt3, Pnt4, Pnt5, Pnt6, Pnt7, Pnt8, Pnt9, Pnt10, Pnt11 = \
+        [Base.Vector(*p) for p in profile.points[0].tolist()]
+
+    edge1 = Part.makeLine(Pnt0,Pnt2)
+    edge2 = Part.makeLine(Pnt2,Pnt3)
+    edge3 = Part.makeLine(Pnt3,Pnt4)
+    edge4 = Part.makeLine(Pnt4,Pnt5)
+    edge5 = Part.makeLine(Pnt5,Pnt6)
+    edge6 = Part.makeLine(Pnt6,Pnt7)
+    edge7 = Part.Arc(Pnt7,Pnt8,Pnt9).toShape()
+
+    # create cutting tool for hexagon head
+    # Parameters s, k, outer circle diameter s*2.0
+    # shared by all levels of detail
+    def hexTool():
+        return fetchStage(SCREW_STAGES, "screw hextool", args,
+                          lambda: profiling.timed("screw", "makeHexTool",
+                                                  thread.makeHexTool, s, k, s*2.0))
+
+    if lod == REAL_THREAD:
+        edgeZ1 = Part.makeLine(Pnt9,Pnt11)
+        edgeZ0 = Part.makeLine(Pnt11,Pnt0)
+        aWire=Part.Wire([edge1,edge2,edge3,edge4,edge5,edge6,edge7, \
+            edgeZ1, edgeZ0])
+
+        def makeHead(tool):
+            aFace =Part.Face(aWire)
+            head = profiling.timed("screw", "revolve", aFace.revolve,
+                                   Base.Vector(0.0,0.0,0.0),Base.Vector(0.0,0.0,1.0),360.0)
+            return profiling.timed("screw", "head.cut", head.cut, tool())
+
+        if generator is None:
+            generator = threadGenerator()
+
+        def shellThread():
+            screw_maker2_2 = screwMaker()
+            o = screw_maker2_2.Screw()
+            screw_maker2_2.Screw.setThreadType(o,'real')
+            # the real thread head does not depend on the screw length
+            head = fetchStage(SCREW_STAGES, "screw maker head", args,
+                lambda: brepcache.fetch(("head", SCREW_MAKER, dia, e, k),
+                    lambda: makeHead(lambda: profiling.timed("screw", "makeHextool",
+                                                             o.makeHextool, s, k, s*2.0))))
+            # the first 18 faces are the head without its bottom face, the
+            # thread shell closes it. Between 3 and 5 mm screw_maker2_2
+            # leaves the tip open and it is cut with a chamfer
+            full = (dia < 3.0) or (dia > 5.0)
+            rthread = fetchStage(SCREW_STAGES, "screw maker thread", args,
+                lambda: brepcache.fetch(("thread", dia, P, halfturns, offSet, full),
+                    lambda: profiling.timed("screw", "makeShellthread",
+                                            o.makeShellthread, dia, P, halfturns, full, offSet)))
+            rthread = rthread.translated(Base.Vector(0.0, 0.0,-a-2.0*P))
+            headShell = Part.Shell(head.Faces[:18] + rthread.Faces)
+            solid = profiling.timed("screw", "Part.Solid", Part.Solid, headShell)
+            if not full:
+                cyl = profiling.timed("screw", "cutChamfer", o.cutChamfer, dia, P, l)
+                solid = profiling.timed("screw", "cut", solid.cut, cyl)
+            return solid
+
+        if generator == SCREW_MAKER:
+            return brepcache.fetch(("screw", SCREW_MAKER, l, P, dia, e, k), shellThread)
+
+        def fuseThread():
+            # the stages are only built when the screw is not on disk yet,
+            # the real thread head does not depend on the screw length
+            head = fetchStage(SCREW_STAGES, "screw head", args,
+                              lambda: brepcache.fetch(("head", BUILTIN_THREAD, dia, e, k),
+                                                      lambda: makeHead(hexTool)))
+            # core, run-out and ridge from the tip up to the fillet under
+            # the head, the chamfer at the tip is part of the core
+            rthread = fetchStage(SCREW_STAGES, "screw thread", args,
+                                 lambda: profiling.timed("screw", "makeThread",
+                                                         thread.makeThread, dia, P, -l, -r))
+            # a single boolean joins the head, the core, the run-out and the ridge
+            solid = profiling.timed("screw", "fuse", head.fuse, rthread.Solids)
+            if len(solid.Solids) == 1:
+                solid = solid.Solids[0]
+            return solid
+
+        return brepcache.fetch(("screw", BUILTIN_THREAD, l, P, dia, e, k), fuseThread)
+
+    # bolt points
+    PntB1, PntB2, PntB3 = [Base.Vector(*p) for p in profile.bolt[0].tolist()]
+
+    edgeB1 = Part.makeLine(Pnt10,PntB1)
+    edgeB2 = Part.makeLine(PntB1,PntB2)
+    edgeB3 = Part.makeLine(PntB2,PntB3)
+
+    edgeZ0 = Part.makeLine(PntB3,Pnt0)
+    if a <= r:
+        edgeB1 = Part.makeLine(Pnt9,PntB1)
+        aWire=Part.Wire([edge1,edge2,edge3,edge4,edge5,edge6,edge7, \
+            edgeB1, edgeB2, edgeB3, edgeZ0])
+
+    else:
+        edge8 = Part.makeLine(Pnt9,Pnt10)
+        edgeB1 = Part.makeLine(Pnt10,PntB1)
+        aWire=Part.Wire([edge1,edge2,edge3,edge4,edge5,edge6,edge7,edge8, \
+            edgeB1, edgeB2, edgeB3, edgeZ0])
+
+    aFace =Part.Face(aWire)
+    head = profiling.timed("screw", "revolve", aFace.revolve,
+                           Base.Vector(0.0,0.0,0.0),Base.Vector(0.0,0.0,1.0),360.0)
+    return profiling.timed("screw", "head.cut", head.cut, hexTool())
+
+
+def setDefaults(obj, kind):
+    """sets the default parameters of the core on a new feature, lengths in mm"""
+    for name, value in core.DEFAULTS[kind].items():
+        setattr(obj, name, value)
+
+
+# saved instead of a fingerprint while a placeholder is shown, so that the
+# part is rebuilt when the document is opened again
+PLACEHOLDER = "placeholder"
+
+
+def executeFeature(proxy, fp, build, placeholder=None):
+    """assigns the shape of fp, taking it from the shape cache. A shape that
+    was restored with the document and still matches the parameters of fp
+    is kept as it is. With a placeholder and background builds enabled, a
+    shape that is not cached is built in the background while the
+    placeholder is shown"""
+    key = proxy.shapeKey(fp)
+    fingerprint = shapecache.fingerprint(key)
+    if getattr(proxy, "restoredFingerprint", None) == fingerprint and not fp.Shape.isNull():
+        withdrawBackground(fp)
+        seedShapeCache(key, fp)
+    elif placeholder is not None and key not in shapecache.shapeCache and submitBackground(fp, key):
+        fp.Shape = placeholder()
+        # the placeholder must not pass for the real shape when saved
+        fingerprint = PLACEHOLDER
+    else:
+        # a build fp waited for must not swap in an outdated shape later
+        withdrawBackground(fp)
+        with profiling.executing(fp):
+            # the property keeps its own placement, the cached shape can be
+            # assigned as it is and shares its geometry with the cache
+            fp.Shape = shapecache.fetch(key, build, copy=False)
+    proxy.restoredFingerprint = None
+    proxy.fingerprint = fingerprint
+
+
+def submitBackground(fp, key):
+    """True if the shape of key is being built in the background for fp"""
+    if not App.GuiUp:
+        return False
+    from . import background
+    return background.isEnabled() and background.submit(fp, key)
+
+
+def withdrawBackground(fp):
+    """cancels the background build fp may still wait for"""
+    if App.GuiUp:
+        from . import background
+        background.withdraw(fp)
+
+
+def restoreFeature(proxy, fp):
+    """validates the shape restored with fp against its parameters. A
+    matching shape is reused without recompute, a stale one or a saved
+    placeholder is touched. Documents saved before fingerprints were
+    stored are left alone"""
+    restored = getattr(proxy, "restoredFingerprint", None)
+    if restored is None:
+        return
+    key = proxy.shapeKey(fp)
+    if restored == shapecache.fingerprint(key) and not fp.Shape.isNull():
+        seedShapeCache(key, fp)
+        proxy.fingerprint = restored
+        proxy.restoredFingerprint = None
+        fp.purgeTouched()
+    else:
+        fp.touch()
+
+
+def seedShapeCache(key, fp):
+    if key not in shapecache.shapeCache:
+        shape = fp.Shape
+        shape.Placement = App.Placement()
+        shapecache.shapeCache.put(key, shape, copy=False)
+
+
+def featureState(proxy):
+    return {"fingerprint": getattr(proxy, "fingerprint", None)}
+
+
+def setFeatureState(proxy, state):
+    proxy.fingerprint = None
+    proxy.restoredFingerprint = state.get("fingerprint") if isinstance(state, dict) else None
+
+
+def rebuildAll(doc):
+    """forgets restored shapes and cached geometry and rebuilds every
+    construction toy part of doc"""
+    shapecache.clear()
+    for obj in doc.Objects:
+        proxy = getattr(obj, "Proxy", None)
+        if hasattr(proxy, "shapeKey"):
+            proxy.restoredFingerprint = None
+            obj.touch()
+    doc.recompute()
+
+
+def applyDisplayDeflection(vobj):
+    """sets the tessellation tolerances of a part view from the
+    MeshDeviation (percent of the part size) and MeshAngularDeflection
+    (degrees) preferences, unset ones keep the FreeCAD defaults. Links and
+    link arrays show the mesh of their prototype, so a coarse prototype
+    makes all its instances cheap to display"""
+    param = getParameters()
+    deviation = param.GetFloat("MeshDeviation", 0.0)
+    angular = param.GetFloat("MeshAngularDeflection", 0.0)
+    if deviation > 0 and hasattr(vobj, "Deviation"):
+        vobj.Deviation = deviation
+    if angular > 0 and hasattr(vobj, "AngularDeflection"):
+        vobj.AngularDeflection = angular
+
+
 class ViewProviderConstructionToy:
     def __init__(self, obj):
         ''' Set this object to the proxy object of the actual view provider '''
         obj.Proxy = self
+        # only new parts, saved documents keep the deflection they were saved with
+        applyDisplayDeflection(obj)
 
     def attach(self, vobj):
         self.vobj = vobj
@@ -65,6 +554,8 @@ class plate(object):
 
     """ Construction Toy plate"""
 
+    kind = "plate"
+
     def __init__(self, obj):
         obj.addProperty("App::PropertyInteger",
                         "xoccurrences", "Plate", "number of modules in x")
@@ -81,50 +572,38 @@ class plate(object):
         obj.addProperty(
             "App::PropertyLength", "holesize", "Module", "hole diameter")
 
-        obj.xoccurrences = 3
-        obj.yoccurrences = 1
-        obj.xsize = '30 mm'
-        obj.ysize = '24 mm'
-        obj.height = '5 mm'
-        obj.holesize = '11 mm'
-	obj.fillet = '1 mm'
+        setDefaults(obj, "plate")
         self.obj = obj
         obj.Proxy = self
 
+    def parameters(self, fp):
+        """normalized property tuple the plate geometry depends on"""
+        return shapecache.normalize((fp.xsize, fp.ysize, fp.height, fp.holesize,
+                                     fp.fillet, fp.xoccurrences, fp.yoccurrences))
+
+    stages = PLATE_STAGES
+
+    def stageNames(self, fp):
+        """the stages of the hole strategy fp is built with"""
+        if usePlateFace(fp.xoccurrences, fp.yoccurrences):
+            return ["plate face", "plate extrusion"]
+        return ["plate block", "plate holes"]
+
+    def shapeKey(self, fp):
+        return (self.kind,) + self.parameters(fp)
+
     def execute(self, fp):
-	xtotal = fp.xsize.Value * fp.xoccurrences
-	ytotal = fp.ysize.Value * fp.yoccurrences
-
-	#App.Console.PrintMessage("xtotal,ytotal:" + str(xtotal) + "," + str(ytotal) + "\n")
-
-    	e1 = LineSegment(App.Vector(0, 0, 0), App.Vector(xtotal, 0, 0)).toShape().Edges[0]
-    	e2 = LineSegment(App.Vector(xtotal, 0, 0), App.Vector(xtotal, ytotal, 0)).toShape().Edges[0]
-    	e3 = LineSegment(App.Vector(xtotal, ytotal, 0), App.Vector(0, ytotal, 0)).toShape().Edges[0]
-    	e4 = LineSegment(App.Vector(0, ytotal, 0), App.Vector(0, 0, 0)).toShape().Edges[0]
-    	w = Wire([e1, e2, e3, e4])
-
-	#hole
-	holes = []
-	for i in range(fp.xoccurrences):
-		for j in range(fp.yoccurrences):
-			holes.append(Part.Wire(Part.makeCircle(fp.holesize.Value/2, App.Vector(fp.xsize.Value/2 + i*fp.xsize.Value, fp.ysize.Value/2 + j*fp.ysize.Value, 0),App.Vector(0, 0, -1))))
-
-        face = Part.Face([w] + holes)
-	baseshape = face.extrude(App.Vector(0, 0, fp.height.Value))
-	if fp.fillet.Value > 0:
-		borders = []
-		for i in range(12):
-			borders.append(baseshape.Edges[i])
-        	fp.Shape = baseshape.makeFillet(fp.fillet.Value, borders)
-	else:
-        	fp.Shape = face.extrude(App.Vector(0, 0, fp.height.Value))
+        params = self.parameters(fp)
+        executeFeature(self, fp, lambda: makePlate(*params))
 
+    def onDocumentRestored(self, fp):
+        restoreFeature(self, fp)
 
     def __getstate__(self):
-        return None
+        return featureState(self)
 
     def __setstate__(self, state):
-        return None
+        setFeatureState(self, state)
 
     def getIcon(self):
         __dirname__ = os.path.dirname(__file__)
@@ -134,47 +613,42 @@ class separator(object):
 
     """ Construction Toy plate"""
 
+    kind = "separator"
+
     def __init__(self, obj):
         obj.addProperty(
             "App::PropertyLength", "outerdiameter", "Separator", "outer diameter")
-	obj.addProperty(
+        obj.addProperty(
             "App::PropertyLength", "fillet", "Separator", "fillet radius")
         obj.addProperty(
             "App::PropertyLength", "height", "Module", "height")
         obj.addProperty(
             "App::PropertyLength", "holesize", "Module", "hole diameter")
 
-        obj.height = '32 mm'
-        obj.outerdiameter = '19 mm'
-        obj.holesize = '11 mm'
-	obj.fillet = '1 mm'
+        setDefaults(obj, "separator")
         self.obj = obj
         obj.Proxy = self
 
-    def execute(self, fp):
-
-    	w = Part.Wire(Part.makeCircle(fp.outerdiameter.Value/2))
-	#hole
-	h = Part.Wire(Part.makeCircle(fp.holesize.Value/2, App.Vector(0, 0, 0), App.Vector(0, 0, -1)))
+    def parameters(self, fp):
+        """normalized property tuple the separator geometry depends on"""
+        return shapecache.normalize((fp.outerdiameter, fp.height, fp.holesize, fp.fillet))
 
-	face = Part.Face([w, h])
+    def shapeKey(self, fp):
+        # washers share the separator geometry, so both use the separator key
+        return ("separator",) + self.parameters(fp)
 
-	baseshape = face.extrude(App.Vector(0, 0, fp.height.Value))
-
-	if fp.fillet.Value > 0:
-		borders = []
-		for i in range(1,3):
-			borders.append(baseshape.Edges[i])
-        	fp.Shape = baseshape.makeFillet(fp.fillet.Value, borders)
-	else:
-        	fp.Shape = face.extrude(App.Vector(0, 0, fp.height.Value))
+    def execute(self, fp):
+        params = self.parameters(fp)
+        executeFeature(self, fp, lambda: makeSeparator(*params))
 
+    def onDocumentRestored(self, fp):
+        restoreFeature(self, fp)
 
     def __getstate__(self):
-        return None
+        return featureState(self)
 
     def __setstate__(self, state):
-        return None
+        setFeatureState(self, state)
 
     def getIcon(self):
         __dirname__ = os.path.dirname(__file__)
@@ -183,11 +657,13 @@ class separator(object):
 class washer(separator):
     """ Construction Toy washer"""
 
+    kind = "washer"
+
     def __init__(self, obj):
-	separator.__init__(self,obj)
-	obj.height = '5 mm'
-	self.obj = obj
-	obj.Proxy = self
+        separator.__init__(self,obj)
+        obj.height = core.DEFAULTS["washer"]["height"]
+        self.obj = obj
+        obj.Proxy = self
 
     def getIcon(self):
         __dirname__ = os.path.dirname(__file__)
@@ -197,6 +673,8 @@ class screw(object):
 
     """ Construction Toy screw"""
 
+    kind = "screw"
+
     def __init__(self, obj):
         obj.addProperty(
             "App::PropertyLength", "height", "Screw", "length")
@@ -208,7 +686,7 @@ class screw(object):
             "App::PropertyLength", "screwpitch", "Screw", "pitch")
         obj.addProperty(
             "App::PropertyBool", "chamfer", "Screw", "chamfer thread")
-	obj.addProperty(
+        obj.addProperty(
             "App::PropertyLength", "fillet", "Screw", "fillet radius")
         obj.addProperty(
             "App::PropertyLength", "outerdiameter", "Screw Head", "outer diameter")
@@ -220,166 +698,87 @@ class screw(object):
             "App::PropertyLength", "crosswidth", "Screw Head", "cross slot width")
         obj.addProperty(
             "App::PropertyLength", "crossdepth", "Screw Head", "cross slot depth")
+        self.addLevelOfDetail(obj)
 
-	obj.height = '30 mm'
-	obj.shanklength = '0 mm'
-	obj.screwdiameter = '9.4 mm'
-	obj.screwpitch = '2 mm'
-	obj.fillet = '1 mm'
-	obj.outerdiameter = '18.5 mm'
-	obj.headheight = '8 mm'
-	obj.internaldiameter = '9.4 mm'
-	obj.crosswidth = '3 mm'
-	obj.crossdepth = '4 mm'
-	obj.chamfer = True
+        setDefaults(obj, "screw")
 
         self.Tuner = 510
 
         self.obj = obj
         obj.Proxy = self
 
-    def execute(self, fp):
+    def parameters(self, fp):
+        """normalized property tuple the screw geometry depends on, the cross
+        slot, shank and fillet properties are not used by the generator yet"""
+        return shapecache.normalize((fp.height, fp.screwpitch, fp.screwdiameter,
+                                     fp.outerdiameter, fp.headheight))
+
+    stages = SCREW_STAGES
+
+    def stageNames(self, fp):
+        """the stages of the level of detail of fp, envelopes have none"""
+        lod = self.levelOfDetail(fp)
+        if lod == REAL_THREAD and threadGenerator() == SCREW_MAKER:
+            return ["screw maker head", "screw maker thread"]
+        if lod == REAL_THREAD:
+            return ["screw hextool", "screw head", "screw thread"]
+        if lod == COSMETIC:
+            return ["screw hextool"]
+        return []
+
+    def addLevelOfDetail(self, obj):
+        obj.addProperty(
+            "App::PropertyEnumeration", "LevelOfDetail", "Screw",
+            "display as bounding cylinders, smooth shank or real thread")
+        obj.LevelOfDetail = LEVELS_OF_DETAIL
+        obj.LevelOfDetail = "Document"
+
+    def levelOfDetail(self, fp):
+        lod = getattr(fp, "LevelOfDetail", "Document")
+        if lod == "Document":
+            return documentLevelOfDetail(fp.Document)
+        return lod
+
+    def shapeKey(self, fp):
+        # the level of detail is the last builder argument, so the other
+        # levels stay cached while switching
+        return (self.kind,) + self.parameters(fp) + (self.levelOfDetail(fp),)
 
-  	o = screw_maker2_2.Screw()
-  	t = screw_maker2_2.Screw.setThreadType(o,'real')
-
-	l = fp.height.Value
-	P = fp.screwpitch.Value;
-	c = 0.5
-	dia = fp.screwdiameter.Value;
-	dw = 1.5 * dia
-	e = fp.outerdiameter.Value;
-	k = fp.headheight.Value;
-	r = 0.5
-	s = 0.9 * e
-
-    	residue, turns = math.modf((l-1*P)/P)
-      	halfturns = 2*int(turns)
-
-    	if residue < 0.5:
-      		a = l - (turns+1.0) * P 
-      		halfturns = halfturns +1
-    	else:
-      		halfturns = halfturns + 2
-      		a = l - (turns+2.0) * P
-
-	offSet = r - a
-
-    	sqrt2_ = 1.0/math.sqrt(2.0)
-    	cham = (e-s)*math.sin(math.radians(15)) # needed for chamfer at head top
-
-    	#Head Points  Usage of k, s, cham, c, dw, dia, r, a
-    	#FreeCAD.Console.PrintMessage("der Kopf mit halfturns: " + str(halfturns) + "\n")
-    	Pnt0 = Base.Vector(0.0,0.0,k)
-    	Pnt2 = Base.Vector(s/2.0,0.0,k)
-    	Pnt3 = Base.Vector(s/math.sqrt(3.0),0.0,k-cham)
-    	Pnt4 = Base.Vector(s/math.sqrt(3.0),0.0,c)
-    	Pnt5 = Base.Vector(dw/2.0,0.0,c)
-    	Pnt6 = Base.Vector(dw/2.0,0.0,0.0)
-    	Pnt7 = Base.Vector(dia/2.0+r,0.0,0.0)     #start of fillet between head and shank
-    	Pnt8 = Base.Vector(dia/2.0+r-r*sqrt2_,0.0,-r+r*sqrt2_) #arc-point of fillet
-    	Pnt9 = Base.Vector(dia/2.0,0.0,-r)        # end of fillet
-    	Pnt10 = Base.Vector(dia/2.0,0.0,-a)        # Start of thread
-
-    	edge1 = Part.makeLine(Pnt0,Pnt2)
-    	edge2 = Part.makeLine(Pnt2,Pnt3)
-    	edge3 = Part.makeLine(Pnt3,Pnt4)
-    	edge4 = Part.makeLine(Pnt4,Pnt5)
-    	edge5 = Part.makeLine(Pnt5,Pnt6)
-    	edge6 = Part.makeLine(Pnt6,Pnt7)
-    	edge7 = Part.Arc(Pnt7,Pnt8,Pnt9).toShape()
-
-    	# create cutting tool for hexagon head
-    	# Parameters s, k, outer circle diameter =  e/2.0+10.0
-    	#extrude = self.makeHextool(s, k, s*2.0)
-
-    	extrude = screw_maker2_2.Screw.makeHextool(o, s, k, s*2.0)
-
-    	#if self.RealThread.isChecked():
-    	if o.rThread:
-		Pnt11 = Base.Vector(0.0,0.0,-r)        # helper point for real thread
-      		edgeZ1 = Part.makeLine(Pnt9,Pnt11)
-      		edgeZ0 = Part.makeLine(Pnt11,Pnt0)
-      		aWire=Part.Wire([edge1,edge2,edge3,edge4,edge5,edge6,edge7, \
-          		edgeZ1, edgeZ0])
-
-      		aFace =Part.Face(aWire)
-      		head = aFace.revolve(Base.Vector(0.0,0.0,0.0),Base.Vector(0.0,0.0,1.0),360.0)
-      		#FreeCAD.Console.PrintMessage("der Kopf mit revolve: " + str(dia) + "\n")
-
-      		# Part.show(extrude)
-      		head = head.cut(extrude)
-      		#FreeCAD.Console.PrintMessage("der Kopf geschnitten: " + str(dia) + "\n")
-      		#Part.show(head)
-
-      		headFaces = []
-      		for i in range(18):
-        		headFaces.append(head.Faces[i])
-
-      		if (dia < 3.0) or (dia > 5.0):
-        		rthread = o.makeShellthread(dia, P, halfturns, True, offSet)
-        		rthread.translate(Base.Vector(0.0, 0.0,-a-2.0*P))
-        		#rthread.translate(Base.Vector(0.0, 0.0,-2.0*P))
-        		#Part.show(rthread)
-        		for tFace in rthread.Faces:
-          			headFaces.append(tFace)
-        		headShell = Part.Shell(headFaces)
-        		head = Part.Solid(headShell)
-      		else:
-        		rthread = o.makeShellthread(dia, P, halfturns, False, offSet)
-        		rthread.translate(Base.Vector(0.0, 0.0,-a-2.0*P))
-        		#rthread.translate(Base.Vector(0.0, 0.0,-2.0*P))
-        		#Part.show(rthread)
-        		for tFace in rthread.Faces:
-          			headFaces.append(tFace)
-        		headShell = Part.Shell(headFaces)
-        		head = Part.Solid(headShell)
-        		cyl = o.cutChamfer(dia, P, l)
-        		#FreeCAD.Console.PrintMessage("vor Schnitt Ende: " + str(dia) + "\n")
-        		head = head.cut(cyl)
-
-    	else:
-      		# bolt points
-      		cham_t = P*math.sqrt(3.0)/2.0*17.0/24.0
-
-      		PntB0 = Base.Vector(0.0,0.0,-a)
-      		PntB1 = Base.Vector(dia/2.0,0.0,-l+cham_t)
-      		PntB2 = Base.Vector(dia/2.0-cham_t,0.0,-l)
-      		PntB3 = Base.Vector(0.0,0.0,-l)
-
-      		edgeB1 = Part.makeLine(Pnt10,PntB1)
-      		edgeB2 = Part.makeLine(PntB1,PntB2)
-      		edgeB3 = Part.makeLine(PntB2,PntB3)
-
-      		edgeZ0 = Part.makeLine(PntB3,Pnt0)
-      		if a <= r:
-        		edgeB1 = Part.makeLine(Pnt9,PntB1)
-        		aWire=Part.Wire([edge1,edge2,edge3,edge4,edge5,edge6,edge7, \
-            			edgeB1, edgeB2, edgeB3, edgeZ0])
-
-      		else:
-        		edge8 = Part.makeLine(Pnt9,Pnt10)
-        		edgeB1 = Part.makeLine(Pnt10,PntB1)
-        		aWire=Part.Wire([edge1,edge2,edge3,edge4,edge5,edge6,edge7,edge8, \
-            			edgeB1, edgeB2, edgeB3, edgeZ0])
-
-      		aFace =Part.Face(aWire)
-      		head = aFace.revolve(Base.Vector(0.0,0.0,0.0),Base.Vector(0.0,0.0,1.0),360.0)
-      		#FreeCAD.Console.PrintMessage("der Kopf mit revolve: " + str(dia) + "\n")
-
-      		# Part.show(extrude)
-      		head = head.cut(extrude)
-      		#FreeCAD.Console.PrintMessage("der Kopf geschnitten: " + str(dia) + "\n")
-
-	fp.Shape = head # Part.Solid(head)
+    def execute(self, fp):
+        key = self.shapeKey(fp)
+        placeholder = None
+        if key[-1] == REAL_THREAD:
+            # real threads can be built in the background behind a smooth shank
+            cosmetic = key[:-1] + (COSMETIC,)
+            placeholder = lambda: shapecache.fetch(cosmetic, lambda: makeScrew(*cosmetic[1:]),
+                                                    copy=False)
+        executeFeature(self, fp, lambda: makeScrew(*key[1:]), placeholder)
+
+    def exportShape(self, fp):
+        """the screw with real threads, built on demand for export. A shape
+        built here stays out of the shape cache, so an export of many screw
+        specs does not keep them all in memory"""
+        params = self.parameters(fp)
+        shape = shapecache.peek((self.kind,) + params + (REAL_THREAD,))
+        if shape is not None:
+            # a new topology to take the placement, the geometry is shared
+            shape = shape.copy(False)
+        else:
+            shape = makeScrew(*params, lod=REAL_THREAD)
+        shape.Placement = fp.Placement
+        return shape
+
+    def onDocumentRestored(self, fp):
+        if not hasattr(fp, "LevelOfDetail"):
+            self.addLevelOfDetail(fp)
+        restoreFeature(self, fp)
 
     def __getstate__(self):
-        return None
+        return featureState(self)
 
     def __setstate__(self, state):
-        return None
+        setFeatureState(self, state)
 
     def getIcon(self):
         __dirname__ = os.path.dirname(__file__)
         return(os.path.join(__dirname__, "icons", "createscrew.svg"))
-
@@ -38,20 +38,33 @@ class constructionToyWorkbench(Workbench):
 		"CreateSeparator",
 		"CreateWasher",
 		"CreateScrew"]
+    tools = ["CreateKit", "CreateBatch", "InstanceDuplicates", "RegenerateParts", "RebuildParts",
+             "CheckKit", "ExportKit", "BillOfMaterials", "ProfileReport"]
 
     def GetClassName(self):
         return "Gui::PythonWorkbench"
 
     def Initialize(self):
 	# imports
-        from .commands import CreatePlate, CreateSeparator, CreateWasher, CreateScrew
+        from .commands import CreatePlate, CreateSeparator, CreateWasher, CreateScrew, \
+            CreateKit, CreateBatch, InstanceDuplicates, RegenerateParts, RebuildParts, CheckKit, \
+            ExportKit, BillOfMaterials, ProfileReport
         self.appendToolbar("Construction Toy", self.commands)
-        self.appendMenu("Construction Toy", self.commands)
+        self.appendMenu("Construction Toy", self.commands + self.tools)
         Gui.addIconPath(App.getHomePath()+"Mod/constructiontoy/icons/")
         Gui.addCommand('CreatePlate', CreatePlate())
         Gui.addCommand('CreateSeparator', CreateSeparator())
         Gui.addCommand('CreateWasher', CreateWasher())
         Gui.addCommand('CreateScrew', CreateScrew())
+        Gui.addCommand('CreateKit', CreateKit())
+        Gui.addCommand('CreateBatch', CreateBatch())
+        Gui.addCommand('InstanceDuplicates', InstanceDuplicates())
+        Gui.addCommand('RegenerateParts', RegenerateParts())
+        Gui.addCommand('RebuildParts', RebuildParts())
+        Gui.addCommand('CheckKit', CheckKit())
+        Gui.addCommand('ExportKit', ExportKit())
+        Gui.addCommand('BillOfMaterials', BillOfMaterials())
+        Gui.addCommand('ProfileReport', ProfileReport())
 
     def Activated(self):
         pass
@@ -0,0 +1,169 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+import FreeCAD as App
+
+__all__ = ["toPlacement", "makeInstance", "makeInstanceArray", "gridPlacements",
+           "iterParts", "findDuplicates", "instanceDuplicates"]
+
+
+def isConstructionToy(obj):
+    """True if obj is a construction toy feature"""
+    proxy = getattr(obj, "Proxy", None)
+    return hasattr(proxy, "shapeKey")
+
+
+def toPlacement(p):
+    """accepts an App.Placement, an (x, y, z) position or a dict with a
+    "position" and optionally an "axis" and an "angle" in degrees"""
+    if isinstance(p, App.Placement):
+        return p
+    if isinstance(p, dict):
+        rotation = App.Rotation(App.Vector(*p.get("axis", (0, 0, 1))), p.get("angle", 0.0))
+        return App.Placement(App.Vector(*p.get("position", (0, 0, 0))), rotation)
+    return App.Placement(App.Vector(*p), App.Rotation())
+
+
+def makeInstance(prototype, placement=None, name=None):
+    """creates a link sharing the shape of prototype at placement"""
+    doc = prototype.Document
+    link = doc.addObject("App::Link", name or prototype.Name + "Instance")
+    link.LinkedObject = prototype
+    link.Label = prototype.Label
+    if placement is not None:
+        link.Placement = toPlacement(placement)
+    return link
+
+
+def makeInstanceArray(prototype, placements, name=None):
+    """creates a single link array holding one element per placement
+
+    placements are App.Placement objects or (x, y, z) tuples.
+    """
+    doc = prototype.Document
+    link = doc.addObject("App::Link", name or prototype.Name + "Array")
+    link.LinkedObject = prototype
+    link.Label = prototype.Label + " array"
+    placements = [toPlacement(p) for p in placements]
+    link.ElementCount = len(placements)
+    link.PlacementList = placements
+    return link
+
+
+def gridPlacements(xcount, ycount, xstep, ystep, zcount=1, zstep=0.0, base=None):
+    """placements of a regular grid, x varying fastest"""
+    base = toPlacement(base) if base is not None else App.Placement()
+    placements = []
+    for k in range(zcount):
+        for j in range(ycount):
+            for i in range(xcount):
+                offset = App.Placement(App.Vector(i*xstep, j*ystep, k*zstep), App.Rotation())
+                placements.append(base.multiply(offset))
+    return placements
+
+
+def iterParts(doc):
+    """yields (label, prototype, global placement) for every construction
+    toy part doc shows: the features themselves and every part shown by
+    links, following links to links and the elements of link arrays"""
+    for obj in doc.Objects:
+        if isConstructionToy(obj):
+            yield obj.Label, obj, obj.getGlobalPlacement()
+        elif obj.TypeId == "App::Link":
+            for part in linkedParts(obj, obj.getGlobalPlacement(), obj.Label, ()):
+                yield part
+
+
+def linkedParts(link, placement, label, visited):
+    """the parts shown by link at placement. The placement of a link
+    replaces the one of its target unless LinkTransform is set, elements
+    of link arrays are placed relative to the array"""
+    if link.Name in visited:
+        return
+    visited += (link.Name,)
+    elements = getattr(link, "ElementList", None) or []
+    if elements:
+        # link arrays showing their elements as objects of their own
+        for i, element in enumerate(elements):
+            for part in linkedParts(element, placement.multiply(element.Placement),
+                                    "{0}[{1}]".format(label, i), visited):
+                yield part
+        return
+    target = link.LinkedObject
+    if isinstance(target, tuple):
+        target = target[0]
+    if target is None:
+        return
+    if getattr(link, "ElementCount", 0):
+        shown = [("{0}[{1}]".format(label, i), placement.multiply(element))
+                 for i, element in enumerate(link.PlacementList)]
+    else:
+        shown = [(label, placement)]
+    for label, placement in shown:
+        if getattr(link, "LinkTransform", False):
+            placement = placement.multiply(target.Placement)
+        if isConstructionToy(target):
+            yield label, target, placement
+        elif target.TypeId in ("App::Link", "App::LinkElement"):
+            for part in linkedParts(target, placement, label, visited):
+                yield part
+
+
+def findDuplicates(doc):
+    """groups the construction toy features of doc by kind and shape key,
+    returning only the groups with more than one member. Washers share the
+    separator shape key but must stay washers"""
+    groups = {}
+    order = []
+    for obj in doc.Objects:
+        if not isConstructionToy(obj):
+            continue
+        key = (obj.Proxy.kind,) + obj.Proxy.shapeKey(obj)
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(obj)
+    return [groups[key] for key in order if len(groups[key]) > 1]
+
+
+def instanceDuplicates(doc):
+    """replaces features with the same parameters by links to the first of
+    them, keeping their placements. Features other objects depend on are
+    left alone. Returns the created links."""
+    links = []
+    doc.openTransaction("Instance duplicates")
+    try:
+        for group in findDuplicates(doc):
+            prototype = group[0]
+            for obj in group[1:]:
+                if obj.InList:
+                    continue
+                placement = obj.Placement
+                label = obj.Label
+                name = obj.Name
+                doc.removeObject(name)
+                link = makeInstance(prototype, placement, name)
+                link.Label = label
+                links.append(link)
+    finally:
+        doc.commitTransaction()
+    doc.recompute()
+    return links
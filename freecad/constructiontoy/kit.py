@@ -0,0 +1,122 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""builds whole models from a compact assembly description
+
+A kit is a JSON text or a dict like
+
+    {"plates": [{"name": "base", "parameters": {"xoccurrences": 4, "yoccurrences": 2},
+                 "placement": [0, 0, 0]}],
+     "stacks": [{"plate": "base", "holes": [[0, 0], [3, 1]],
+                 "parts": ["washer", {"type": "separator", "parameters": {"height": 16}}],
+                 "screw": {"height": 40}}]}
+
+Each stack is put on top of the plate at every listed hole, "holes": "all"
+uses every hole. Rings are stacked upwards and the screw goes down through
+them with its head on the topmost one. Identical specs are created once
+and the other occurrences become elements of a link array.
+"""
+
+import json
+from collections import OrderedDict
+
+import FreeCAD as App
+
+from . import core
+from .instances import toPlacement, makeInstanceArray
+
+__all__ = ["expandKit", "buildKit"]
+
+
+def _spec(entry, default=None):
+    """(kind, parameters) of a part entry, either a type name or a dict"""
+    if isinstance(entry, str):
+        return entry, {}
+    return entry.get("type", default), entry.get("parameters", {})
+
+
+def expandKit(kit):
+    """expands a kit description into a list of (kind, parameters, placement)"""
+    if isinstance(kit, str):
+        kit = json.loads(kit)
+    parts = []
+    plates = {}
+    for entry in kit.get("plates", []):
+        kind, parameters = _spec(entry, "plate")
+        placement = toPlacement(entry.get("placement", (0, 0, 0)))
+        name = entry.get("name", "plate" + str(len(plates)))
+        if name in plates:
+            raise ValueError("duplicate plate name: " + name)
+        plates[name] = (core.describe("plate", parameters), placement)
+        parts.append(("plate", parameters, placement))
+
+    for stack in kit.get("stacks", []):
+        try:
+            geometry, placement = plates[stack["plate"]]
+        except KeyError:
+            raise ValueError("stack on unknown plate: " + str(stack.get("plate")))
+        holes = stack.get("holes", "all")
+        if holes == "all":
+            holes = [(i, j) for i in range(geometry.xoccurrences) for j in range(geometry.yoccurrences)]
+        for i, j in holes:
+            if not (0 <= i < geometry.xoccurrences and 0 <= j < geometry.yoccurrences):
+                raise ValueError("plate {0} has no hole {1}".format(stack["plate"], (i, j)))
+            x = geometry.xsize/2 + i*geometry.xsize
+            y = geometry.ysize/2 + j*geometry.ysize
+            z = geometry.height
+            for entry in stack.get("parts", []):
+                kind, parameters = _spec(entry)
+                local = App.Placement(App.Vector(x, y, z), App.Rotation())
+                parts.append((kind, parameters, placement.multiply(local)))
+                z += core.partParameters(kind, parameters)["height"]
+            if "screw" in stack:
+                kind, parameters = _spec(stack["screw"], "screw")
+                local = App.Placement(App.Vector(x, y, z), App.Rotation())
+                parts.append(("screw", parameters, placement.multiply(local)))
+    return parts
+
+
+def buildKit(kit, doc=None, fit=True):
+    """creates the parts of a kit in one transaction and recomputes once.
+    Returns the created prototypes and link arrays"""
+    from .batch import makeFeature
+    doc = doc or App.ActiveDocument
+    groups = OrderedDict()
+    for kind, parameters, placement in expandKit(kit):
+        key = (kind, tuple(sorted(core.partParameters(kind, parameters).items())))
+        groups.setdefault(key, (kind, parameters, []))[2].append(placement)
+
+    created = []
+    doc.openTransaction("Build kit")
+    try:
+        for kind, parameters, placements in groups.values():
+            prototype = makeFeature(doc, kind, parameters, placements[0])
+            created.append(prototype)
+            if len(placements) > 1:
+                # element placements are applied without the prototype placement
+                created.append(makeInstanceArray(prototype, placements[1:]))
+    finally:
+        doc.commitTransaction()
+    doc.recompute()
+    if fit and App.GuiUp:
+        import FreeCADGui as Gui
+        Gui.SendMsgToActiveView("ViewFit")
+    return created
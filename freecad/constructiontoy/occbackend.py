@@ -0,0 +1,48 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""FreeCAD/OCC backend of the parametric core"""
+
+from . import core
+from .features import makePlate, makeSeparator, makeScrew
+
+__all__ = ["OccBackend"]
+
+
+class OccBackend(object):
+
+    """ builds Part shapes from core geometry descriptions"""
+
+    def build(self, geometry, lod=None):
+        if isinstance(geometry, core.PlateGeometry):
+            return makePlate(geometry.xsize, geometry.ysize, geometry.height, geometry.holesize,
+                             geometry.fillet, geometry.xoccurrences, geometry.yoccurrences)
+        if isinstance(geometry, core.RingGeometry):
+            return makeSeparator(geometry.outerdiameter, geometry.height, geometry.holesize,
+                                 geometry.fillet)
+        args = (geometry.height, geometry.screwpitch, geometry.screwdiameter,
+                geometry.outerdiameter, geometry.headheight)
+        if lod is None:
+            return makeScrew(*args)
+        return makeScrew(*args, lod=lod)
+
+
+core.registerBackend("occ", OccBackend)
@@ -0,0 +1,174 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+import os, sys, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import FreeCAD as App
+import Part
+
+from . import shapecache
+from .instances import isConstructionToy
+from .preferences import getParameters
+
+__all__ = ["regenerate", "buildShapes", "workerCount", "poolContext"]
+
+# shape key kind -> builder in features
+BUILDERS = {"plate": "makePlate",
+            "separator": "makeSeparator",
+            "screw": "makeScrew"}
+
+
+def buildBrep(key):
+    """builds the shape for a shape key and returns it as BREP text, this
+    is what runs inside the workers"""
+    from . import features
+    builder = getattr(features, BUILDERS[key[0]])
+    return builder(*key[1:]).exportBrepToString()
+
+
+def workerCount():
+    """ParallelWorkers preference, 0 meaning one worker per core"""
+    workers = getParameters().GetInt("ParallelWorkers", 0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def shapeFromBrep(brep):
+    shape = Part.Shape()
+    shape.importBrepFromString(brep)
+    return shape
+
+
+def pythonExecutable():
+    """the Python interpreter FreeCAD was built with. sys.executable is the
+    FreeCAD binary itself, which must not be launched as a worker"""
+    executable = getParameters().GetString("ParallelPython", "")
+    if executable:
+        return executable
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        return sys.executable
+    names = ["python.exe", "python3.exe"] if os.name == "nt" else ["python3", "python"]
+    for directory in (os.path.dirname(sys.executable), os.path.join(sys.prefix, "bin"), sys.prefix):
+        for name in names:
+            candidate = os.path.join(directory, name)
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+
+def poolContext():
+    """multiprocessing context of the worker pools, None if there is no safe
+    one. The ParallelStartMethod preference picks the start method, but the
+    Qt GUI process is never forked, and spawned workers run FreeCAD's Python
+    interpreter (ParallelPython preference) instead of the FreeCAD binary"""
+    method = getParameters().GetString("ParallelStartMethod", "") or None
+    if App.GuiUp and method in (None, "fork"):
+        method = "spawn"
+    context = multiprocessing.get_context(method)
+    if context.get_start_method() != "fork":
+        executable = pythonExecutable()
+        if executable is None:
+            App.Console.PrintWarning("construction toy: no Python interpreter found for the worker "
+                                     "processes, set the ParallelPython preference\n")
+            return None
+        context.set_executable(executable)
+    return context
+
+
+def _buildSerial(keys):
+    return [buildBrep(key) for key in keys]
+
+
+def _buildParallel(keys, workers, context):
+    """builds the keys in a pool, a key whose worker failed is built again
+    in this process"""
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(buildBrep, key) for key in keys]
+        breps = []
+        for key, future in zip(keys, futures):
+            try:
+                breps.append(future.result())
+            except Exception as e:
+                App.Console.PrintWarning("construction toy: worker failed on " + str(key) +
+                                         ", building it here: " + str(e) + "\n")
+                breps.append(buildBrep(key))
+        return breps
+
+
+def buildShapes(keys, workers=None):
+    """builds the shapes of the given shape keys, returns them in key order.
+
+    Both the parallel and the serial path go through BREP serialization, so
+    their results are identical. If the pool cannot be used the shapes are
+    built serially, so are the shapes whose worker failed.
+    """
+    keys = list(keys)
+    workers = workerCount() if workers is None else workers
+    workers = min(workers, len(keys))
+    context = poolContext() if workers > 1 else None
+    if context is not None:
+        try:
+            breps = _buildParallel(keys, workers, context)
+        except Exception as e:
+            App.Console.PrintWarning("construction toy: parallel build failed, building serially: "
+                                     + str(e) + "\n")
+            breps = _buildSerial(keys)
+    else:
+        breps = _buildSerial(keys)
+    return [shapeFromBrep(brep) for brep in breps]
+
+
+def regenerate(objects=None, doc=None, workers=None):
+    """regenerates construction toy features, building every distinct
+    parameter set once in a worker pool.
+
+    The built shapes are put into the shape cache and the document is
+    recomputed, so each execute() assigns its Shape on the main thread from
+    a cache hit. Returns the number of shapes that were built.
+    """
+    doc = doc or App.ActiveDocument
+    if objects is None:
+        objects = doc.Objects
+    objects = [obj for obj in objects if isConstructionToy(obj)]
+
+    keys = []
+    seen = set()
+    for obj in objects:
+        key = obj.Proxy.shapeKey(obj)
+        if key not in seen and key not in shapecache.shapeCache:
+            seen.add(key)
+            keys.append(key)
+
+    cache = shapecache.shapeCache
+    maxsize = cache.maxsize
+    # keep every result alive until the recompute has consumed it
+    cache.resize(max(maxsize, len(cache) + len(keys)))
+    try:
+        for key, shape in zip(keys, buildShapes(keys, workers)):
+            cache.put(key, shape, copy=False)
+        for obj in objects:
+            obj.touch()
+        doc.recompute()
+    finally:
+        cache.resize(maxsize)
+    return len(keys)
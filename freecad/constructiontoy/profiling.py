@@ -0,0 +1,148 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""per stage timers and face/edge counters of the feature generators
+
+Profiling is off unless the Profile preference is set or the environment
+variable CONSTRUCTIONTOY_PROFILE is 1. When it is off, executing() returns
+a shared do-nothing context and timed() calls straight through.
+"""
+
+import os, time
+
+from .preferences import getParameters
+
+__all__ = ["enable", "isEnabled", "timed", "executing", "stats", "report", "reset"]
+
+_enabled = os.environ.get("CONSTRUCTIONTOY_PROFILE") == "1" or \
+    getParameters().GetBool("Profile", False)
+_document = None
+# (document, part, stage) -> [calls, seconds, faces, edges]
+_stats = {}
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+
+
+def isEnabled():
+    return _enabled
+
+
+class _NullContext(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_null = _NullContext()
+
+
+class _Stage(object):
+
+    """ times one stage and counts the faces and edges of its result"""
+
+    def __init__(self, part, name):
+        self.key = (_document, part, name)
+        self.faces = 0
+        self.edges = 0
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        entry = _stats.setdefault(self.key, [0, 0.0, 0, 0])
+        entry[0] += 1
+        entry[1] += time.time() - self.start
+        entry[2] += self.faces
+        entry[3] += self.edges
+        return False
+
+    def count(self, shape):
+        self.faces += len(shape.Faces)
+        self.edges += len(shape.Edges)
+        return shape
+
+
+class _Executing(object):
+
+    """ attributes the stages run inside to the document of a feature"""
+
+    def __init__(self, fp):
+        self.document = fp.Document.Name
+
+    def __enter__(self):
+        global _document
+        self.previous = _document
+        _document = self.document
+        return self
+
+    def __exit__(self, *args):
+        global _document
+        _document = self.previous
+        return False
+
+
+def timed(part, name, function, *args):
+    """calls function(*args) as a timed stage returning a shape"""
+    if not _enabled:
+        return function(*args)
+    with _Stage(part, name) as st:
+        return st.count(function(*args))
+
+
+def executing(fp):
+    """context manager wrapping execute() of the feature fp"""
+    if not _enabled:
+        return _null
+    return _Executing(fp)
+
+
+def stats(document=None):
+    """aggregated stats as {(part, stage): (calls, seconds, faces, edges)}
+    for one document, or for all documents if document is None"""
+    result = {}
+    for (doc, part, name), values in _stats.items():
+        if document is not None and doc != document:
+            continue
+        entry = result.setdefault((part, name), [0, 0.0, 0, 0])
+        for i, v in enumerate(values):
+            entry[i] += v
+    return dict((key, tuple(values)) for key, values in result.items())
+
+
+def report(document=None):
+    """stats as a text table, slowest stage first"""
+    lines = ["{0:10s} {1:24s} {2:>7s} {3:>10s} {4:>9s} {5:>9s}".format(
+        "part", "stage", "calls", "seconds", "faces", "edges")]
+    rows = sorted(stats(document).items(), key=lambda item: -item[1][1])
+    for (part, name), (calls, seconds, faces, edges) in rows:
+        lines.append("{0:10s} {1:24s} {2:7d} {3:10.4f} {4:9d} {5:9d}".format(
+            part, name, calls, seconds, faces, edges))
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    _stats.clear()
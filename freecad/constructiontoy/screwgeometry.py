@@ -0,0 +1,140 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""vectorized screw parameters and profile points
+
+Everything here works on numpy arrays of screw specs and does not need
+FreeCAD, so whole catalogs can be sized without building a single shape.
+Scalars are accepted as arrays of one element.
+"""
+
+from __future__ import division
+from collections import namedtuple
+
+import numpy as np
+
+from .core import HEAD_CHAMFER, FILLET, FLATS, WASHER, THREAD_CREST, THREAD_OVERLAP
+
+__all__ = ["ScrewProfile", "threadTurns", "screwProfile", "helixPoints"]
+
+ScrewProfile = namedtuple("ScrewProfile", [
+    "halfturns",    # (N,) int, thread length in half turns
+    "a",            # (N,) distance from the head to the start of the thread
+    "offSet",       # (N,) thread offset passed to the thread generator
+    "s",            # (N,) width across flats
+    "dw",           # (N,) washer face diameter
+    "cham",         # (N,) chamfer at the head top
+    "cham_t",       # (N,) chamfer at the thread end
+    "points",       # (N, 11, 3) head profile Pnt0, Pnt2..Pnt11 in the xz plane
+    "bolt",         # (N, 3, 3) smooth shank end points PntB1..PntB3
+])
+
+
+def threadTurns(height, pitch):
+    """returns (halfturns, a) for arrays of screw lengths and pitches"""
+    l = np.asarray(height, dtype=float)
+    P = np.asarray(pitch, dtype=float)
+    residue, turns = np.modf((l - P) / P)
+    short = residue < 0.5
+    halfturns = 2 * turns.astype(int) + np.where(short, 1, 2)
+    a = np.where(short, l - (turns + 1.0) * P, l - (turns + 2.0) * P)
+    return halfturns, a
+
+
+def screwProfile(height, pitch, diameter, outerdiameter, headheight):
+    """computes the head profile and thread parameters of N screws"""
+    l, P, dia, e, k = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v, dtype=float))
+                                            for v in (height, pitch, diameter, outerdiameter,
+                                                      headheight)])
+    c = HEAD_CHAMFER
+    r = FILLET
+    s = FLATS * e
+    dw = WASHER * dia
+    halfturns, a = threadTurns(l, P)
+    offSet = r - a
+
+    sqrt2_ = 1.0 / np.sqrt(2.0)
+    cham = (e - s) * np.sin(np.radians(15))  # needed for chamfer at head top
+    corner = s / np.sqrt(3.0)
+    zero = np.zeros_like(l)
+
+    xs = np.stack([zero,                        # Pnt0
+                   s / 2.0,                     # Pnt2
+                   corner,                      # Pnt3
+                   corner,                      # Pnt4
+                   dw / 2.0,                    # Pnt5
+                   dw / 2.0,                    # Pnt6
+                   dia / 2.0 + r,               # Pnt7 start of fillet between head and shank
+                   dia / 2.0 + r - r * sqrt2_,  # Pnt8 arc-point of fillet
+                   dia / 2.0,                   # Pnt9 end of fillet
+                   dia / 2.0,                   # Pnt10 start of thread
+                   zero], axis=-1)              # Pnt11 helper point for real thread
+    zs = np.stack([k,
+                   k,
+                   k - cham,
+                   zero + c,
+                   zero + c,
+                   zero,
+                   zero,
+                   zero - r + r * sqrt2_,
+                   zero - r,
+                   -a,
+                   zero - r], axis=-1)
+    points = np.stack([xs, np.zeros_like(xs), zs], axis=-1)
+
+    cham_t = P * np.sqrt(3.0) / 2.0 * 17.0 / 24.0
+    bolt = np.stack([np.stack([dia / 2.0, zero, -l + cham_t], axis=-1),
+                     np.stack([dia / 2.0 - cham_t, zero, -l], axis=-1),
+                     np.stack([zero, zero, -l], axis=-1)], axis=-2)
+
+    return ScrewProfile(halfturns, a, offSet, s, dw, cham, cham_t, points, bolt)
+
+
+def helixPoints(diameter, pitch, height, samples=16):
+    """samples the thread helix of N screws at their major diameter.
+
+    The helix is placed the way thread.makeThread places the run-out and
+    the ridge between the tip at z = -height and the fillet at z = -FILLET,
+    rising from the tip towards the head. Returns an (N, M, 3) array padded
+    with nan, where M fits the longest thread, and the (N,) number of valid
+    samples.
+    """
+    dia, P, l = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v, dtype=float))
+                                      for v in (diameter, pitch, height)])
+    depth = P * np.sqrt(3.0) / 2.0 * 17.0 / 24.0
+    rmin = dia / 2.0 - depth
+    width = THREAD_CREST * P + 2.0 * (depth + THREAD_OVERLAP * P) * np.tan(np.radians(30))
+    start = -l + width / 2.0 + np.minimum(depth, rmin / 2.0)
+    # one turn of run-out, then the whole turns of the ridge that fit below
+    # the fillet
+    ridge = np.floor((-FILLET - width / 2.0 - start - P) / P)
+    turns = np.where(ridge >= 0, ridge + 1, 0).astype(int)
+    counts = np.where(turns > 0, turns * samples + 1, 0)
+    t = np.arange(max(counts.max(), 1)) / samples   # turns
+    valid = t[np.newaxis, :] * samples < counts[:, np.newaxis]
+    angle = 2.0 * np.pi * t
+    radius = dia[:, np.newaxis] / 2.0
+    x = radius * np.cos(angle)
+    y = radius * np.sin(angle)
+    z = start[:, np.newaxis] + P[:, np.newaxis] * t
+    helix = np.stack(np.broadcast_arrays(x, y, z), axis=-1).astype(float)
+    helix[~valid] = np.nan
+    return helix, counts
@@ -0,0 +1,152 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+import hashlib
+from collections import OrderedDict
+
+from .preferences import getParameters
+
+__all__ = ["ShapeCache", "normalize", "fingerprint", "fetch", "peek", "stats", "clear", "resize"]
+
+# bump whenever the geometry generators change their output
+GEOMETRY_VERSION = 3
+
+
+def normalize(values):
+    """returns a hashable tuple of property values, rounding lengths so that
+    numerically identical parts map to the same key"""
+    key = []
+    for v in values:
+        if hasattr(v, "Value"):
+            v = v.Value
+        if isinstance(v, bool):
+            key.append(v)
+        elif isinstance(v, int):
+            key.append(v)
+        elif isinstance(v, float):
+            key.append(round(v, 6))
+        else:
+            key.append(v)
+    return tuple(key)
+
+
+def fingerprint(key):
+    """compact hash of a shape key, stored with documents to tell whether a
+    saved shape still matches the parameters of its feature"""
+    return hashlib.sha1(repr((GEOMETRY_VERSION,) + tuple(key)).encode("utf-8")).hexdigest()
+
+
+class ShapeCache(object):
+
+    """ size bounded LRU cache of generated shapes"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._shapes = OrderedDict()
+
+    def __len__(self):
+        return len(self._shapes)
+
+    def __contains__(self, key):
+        return key in self._shapes
+
+    def get(self, key, copy=True):
+        """returns a copy of the cached shape or None. Without copy the
+        cached shape itself is returned and must not be modified"""
+        try:
+            shape = self._shapes.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._shapes[key] = shape
+        self.hits += 1
+        return shape.copy() if copy else shape
+
+    def peek(self, key):
+        """returns the cached shape itself or None, without touching the
+        recency order or the hit and miss counts"""
+        return self._shapes.get(key)
+
+    def put(self, key, shape, copy=True):
+        """stores shape, evicting the least recently used entries"""
+        self._shapes.pop(key, None)
+        self._shapes[key] = shape.copy() if copy else shape
+        self._evict()
+
+    def fetch(self, key, build, copy=True):
+        """returns the cached shape for key, calling build() on a miss"""
+        shape = self.get(key, copy)
+        if shape is None:
+            shape = build()
+            self.put(key, shape, copy)
+        return shape
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        self._evict()
+
+    def clear(self):
+        self._shapes.clear()
+
+    def stats(self):
+        return {"size": len(self._shapes),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions}
+
+    def _evict(self):
+        while len(self._shapes) > max(self.maxsize, 0):
+            self._shapes.popitem(last=False)
+            self.evictions += 1
+
+
+shapeCache = ShapeCache(getParameters().GetInt("ShapeCacheSize", 256))
+# intermediate stages get their own bound, so that they never evict the
+# final shapes of the parts
+stageCache = ShapeCache(getParameters().GetInt("StageCacheSize", 128))
+# (volume, source) of the specs in bills of materials, kept without copying
+volumeCache = ShapeCache(getParameters().GetInt("VolumeCacheSize", 4096))
+
+
+def fetch(key, build, copy=True):
+    return shapeCache.fetch(key, build, copy)
+
+
+def peek(key):
+    return shapeCache.peek(key)
+
+
+def stats():
+    return shapeCache.stats()
+
+
+def clear():
+    shapeCache.clear()
+    stageCache.clear()
+    volumeCache.clear()
+
+
+def resize(maxsize):
+    shapeCache.resize(maxsize)
@@ -0,0 +1,119 @@
+#***************************************************************************
+#*                                                                         *
+#*   This program is free software; you can redistribute it and/or modify  *
+#*   it under the terms of the GNU Lesser General Public License (LGPL)    *
+#*   as published by the Free Software Foundation; either version 2 of     *
+#*   the License, or (at your option) any later version.                   *
+#*   for detail see the LICENCE text file.                                 *
+#*                                                                         *
+#*   This program is distributed in the hope that it will be useful,       *
+#*   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+#*   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+#*   GNU Library General Public License for more details.                  *
+#*                                                                         *
+#*   You should have received a copy of the GNU Library General Public     *
+#*   License along with this program; if not, write to the Free Software   *
+#*   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+#*   USA                                                                   *
+#*                                                                         *
+#***************************************************************************
+
+
+"""thread and hexagon tool generator of the toy screw
+
+The toy has a single coarse 60 degree thread. Its ridge is a single sweep
+of a trapezoid along a helix over the whole threaded length, so the shank
+is made of three solids: the revolved core, the ridge and a run-out turn.
+The chamfer at the tip is part of the core profile and the ridge runs out
+into it along a conical helix, so no boolean cut is needed for it.
+"""
+
+from __future__ import division
+import math
+
+import FreeCAD as App
+import Part
+
+from .core import THREAD_CREST, THREAD_OVERLAP as OVERLAP
+
+__all__ = ["threadDepth", "makeHexTool", "makeRidge", "makeThread"]
+
+
+def threadDepth(pitch):
+    """depth of the external thread, 17/24 of the fundamental triangle"""
+    return pitch * math.sqrt(3.0) / 2.0 * 17.0 / 24.0
+
+
+def makeHexTool(s, k, outer):
+    """tool removing everything outside the hexagon with width across flats
+    s from a head of height k and at most outer in diameter"""
+    r = s / math.sqrt(3.0)
+    corners = [App.Vector(r * math.cos(math.radians(60 * i)), r * math.sin(math.radians(60 * i)), -1.0)
+               for i in range(7)]
+    hexagon = Part.makePolygon(corners)
+    circle = Part.Wire(Part.makeCircle(outer / 2.0, App.Vector(0, 0, -1.0)))
+    return Part.Face([circle, hexagon]).extrude(App.Vector(0, 0, k + 2.0))
+
+
+def ridgeWidths(pitch):
+    """(crest, root) widths of the ridge profile"""
+    crest = THREAD_CREST * pitch
+    root = crest + 2.0 * (threadDepth(pitch) + OVERLAP * pitch) * math.tan(math.radians(30))
+    return crest, root
+
+
+def makeProfile(radius, pitch):
+    """closed trapezoid in the xz plane, its root at radius"""
+    crest, root = ridgeWidths(pitch)
+    outer = radius + threadDepth(pitch) + OVERLAP * pitch
+    points = [App.Vector(radius, 0, -root / 2.0),
+              App.Vector(outer, 0, -crest / 2.0),
+              App.Vector(outer, 0, crest / 2.0),
+              App.Vector(radius, 0, root / 2.0),
+              App.Vector(radius, 0, -root / 2.0)]
+    return Part.makePolygon(points)
+
+
+def makeRidge(radius, pitch, turns, taper=0.0):
+    """the ridge over a number of turns starting at z = 0, its root on a
+    helix of the given radius, as one sweep. With a taper the helix is
+    conical and its radius grows by taper per turn"""
+    angle = math.degrees(math.atan2(taper, pitch))
+    helix = Part.makeHelix(pitch, turns * pitch, radius, angle)
+    return Part.Wire(helix).makePipeShell([makeProfile(radius, pitch)], True, True)
+
+
+def makeThread(diameter, pitch, bottom, top, chamfer=True):
+    """solids of a threaded shank between z = bottom (the tip) and z = top,
+    returned as a compound of the core, the run-out and the ridge, ready to
+    be fused with the head in a single boolean"""
+    depth = threadDepth(pitch)
+    rmin = diameter / 2.0 - depth
+    root = rmin - OVERLAP * pitch
+    crest, width = ridgeWidths(pitch)
+    c = min(depth, rmin / 2.0) if chamfer else 0.0
+
+    profile = [App.Vector(0, 0, bottom),
+               App.Vector(rmin - c, 0, bottom),
+               App.Vector(rmin, 0, bottom + c),
+               App.Vector(rmin, 0, top),
+               App.Vector(0, 0, top),
+               App.Vector(0, 0, bottom)]
+    core = Part.Face(Part.makePolygon(profile)).revolve(App.Vector(0, 0, 0), App.Vector(0, 0, 1), 360.0)
+
+    solids = [core]
+    start = bottom + width / 2.0
+    if chamfer:
+        # run-out: one turn rising out of the chamfer on a conical helix,
+        # it ends where the ridge starts
+        start += c
+        sink = depth + OVERLAP * pitch
+        if start + pitch + width / 2.0 <= top:
+            runout = makeRidge(root - sink, pitch, 1, sink)
+            solids.append(runout.translated(App.Vector(0, 0, start)))
+        start += pitch
+
+    turns = int(math.floor((top - width / 2.0 - start) / pitch))
+    if turns > 0:
+        solids.append(makeRidge(root, pitch, turns).translated(App.Vector(0, 0, start)))
+    return Part.makeCompound(solids)
@@ -0,0 +1,57 @@
+"""tests of the FreeCAD-free part logic, run with python -m pytest"""
+
+import pytest
+
+from freecad.constructiontoy import core
+
+
+def test_describe_converts_lengths():
+    g = core.describe("separator", {"height": "1 cm", "holesize": 4})
+    assert g.height == 10.0
+    assert g.holesize == 4.0
+    assert g.outerdiameter == core.DEFAULTS["separator"]["outerdiameter"]
+
+
+def test_describe_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        core.describe("gear")
+
+
+@pytest.mark.parametrize("kind", sorted(core.DEFAULTS))
+def test_defaults_are_valid(kind):
+    assert core.validate(kind) == []
+
+
+@pytest.mark.parametrize("kind, parameters", [
+    ("plate", {"xoccurrences": 0}),
+    ("plate", {"holesize": 40.0}),
+    ("plate", {"fillet": 3.0}),
+    ("separator", {"holesize": 19.0}),
+    ("washer", {"fillet": 4.0}),
+    ("screw", {"height": 1.0}),
+    ("screw", {"screwpitch": -2.0}),
+    ("screw", {"outerdiameter": 10.0}),
+])
+def test_invalid_specs(kind, parameters):
+    assert core.validate(kind, parameters)
+
+
+def test_validate_bill_of_materials():
+    entries = [("plate", {}),
+               ("separator", {"holesize": 30.0}),
+               ("screw", None),
+               ("separator", {"holesize": 30.0}),
+               ("gear", {})]
+    problems = core.validateBillOfMaterials(entries)
+    assert sorted(problems) == [1, 3, 4]
+    assert problems[1] == problems[3]
+
+
+def test_stub_backend_boxes():
+    backend = core.getBackend("stub")
+    plate = backend.build(core.describe("plate", {"xoccurrences": 2, "yoccurrences": 3}))
+    assert plate.boundbox == ((0.0, 0.0, 0.0), (60.0, 72.0, 5.0))
+    assert plate.holes == 6
+    screw = backend.build(core.describe("screw"))
+    assert screw.boundbox[0][2] == -30.0
+    assert screw.boundbox[1][2] == 8.0
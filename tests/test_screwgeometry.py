@@ -0,0 +1,41 @@
+"""tests of the vectorized screw geometry, run with python -m pytest"""
+
+import numpy as np
+import pytest
+
+from freecad.constructiontoy import core, screwgeometry
+
+
+LENGTHS = [5.0, 9.9, 10.0, 12.5, 30.0, 61.0]
+PITCHES = [1.0, 1.5, 2.0, 3.0]
+
+
+def test_screw_parameters_match_vectorized_profile():
+    l, P = np.meshgrid(LENGTHS, PITCHES)
+    l, P = l.ravel(), P.ravel()
+    profile = screwgeometry.screwProfile(l, P, 9.4, 18.5, 8.0)
+    for i in range(len(l)):
+        g = core.screwParameters(l[i], P[i], 9.4, 18.5, 8.0)
+        assert g.halfturns == profile.halfturns[i]
+        for name in ("a", "offSet", "s", "dw", "cham", "cham_t"):
+            assert getattr(g, name) == pytest.approx(float(getattr(profile, name)[i]))
+
+
+def test_thread_turns():
+    halfturns, a = screwgeometry.threadTurns([30.0, 31.0], [2.0, 2.0])
+    # 14 full turns after the first pitch, a residue of 0 or 0.5 turns
+    assert list(halfturns) == [29, 30]
+    assert list(a) == pytest.approx([0.0, -1.0])
+
+
+def test_helix_runs_between_tip_and_fillet():
+    l, P = np.meshgrid(LENGTHS, PITCHES)
+    l, P = l.ravel(), P.ravel()
+    helix, counts = screwgeometry.helixPoints(9.4, P, l)
+    assert counts.max() > 0
+    for i in range(len(l)):
+        z = helix[i, :counts[i], 2]
+        assert np.isnan(helix[i, counts[i]:]).all()
+        assert (z >= -l[i]).all() and (z <= -core.FILLET).all()
+        # rising from the tip towards the head
+        assert (np.diff(z) > 0).all()
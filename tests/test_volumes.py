@@ -0,0 +1,46 @@
+"""tests of the closed form part volumes of the bill of materials, run
+with python -m pytest"""
+
+import math
+
+import pytest
+
+from freecad.constructiontoy import core
+
+
+def test_plate_volume_without_fillet():
+    g = core.describe("plate", {"fillet": 0.0})
+    box = g.xtotal * g.ytotal * g.height
+    assert core.volume(g) == pytest.approx(box - 3 * math.pi * (g.holesize/2)**2 * g.height)
+
+
+def test_rounded_plate_volume():
+    # a fillet of half the height rounds the edges of a plate without holes
+    # into a stadium, a box with half cylinders at the sides and quarter
+    # spheres at the corners
+    g = core.describe("plate", {"fillet": 2.0, "height": 4.0, "holesize": 2.0})
+    g = g._replace(holecenters=[])
+    r = 2.0
+    a, b = g.xtotal - 2*r, g.ytotal - 2*r
+    expected = a*b*4.0 + math.pi*r*r*(a + b) + 4.0/3.0*math.pi*r**3
+    assert core.plateVolume(g._replace(fillet=r - 1e-9)) == pytest.approx(expected, rel=1e-6)
+
+
+def test_ring_volume():
+    g = core.describe("separator", {"fillet": 0.0})
+    tube = math.pi * ((g.outerdiameter/2)**2 - (g.holesize/2)**2) * g.height
+    assert core.volume(g) == pytest.approx(tube)
+    filleted = core.volume(core.describe("separator"))
+    area, offset = core.spandrel(1.0)
+    assert tube - filleted == pytest.approx(4 * math.pi * (g.outerdiameter/2 - offset) * area)
+
+
+def test_revolved_volume_of_a_cone():
+    assert core.revolvedVolume([(0.0, 0.0), (3.0, 0.0), (0.0, 4.0)]) == pytest.approx(math.pi * 9 * 4 / 3)
+
+
+def test_screw_volume_is_bounded_by_its_cylinders():
+    g = core.describe("screw")
+    corner = g.s / math.sqrt(3.0)
+    outer = math.pi * corner**2 * g.headheight + math.pi * (g.screwdiameter/2)**2 * g.height
+    assert 0.0 < core.volume(g) < outer